@@ -2,67 +2,209 @@
 SQLite database for storing lux history and system state.
 """
 
+import queue
 import sqlite3
 import threading
 import time
 from contextlib import contextmanager
-from typing import List, Dict, Optional, Any
+from itertools import count, groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import List, Dict, Iterator, Optional, Any
 
 DB_PATH = "chamber_data.db"
 
+# Logged rows are queued to a background writer thread, which commits them in
+# one transaction once either limit is reached, so the 100 ms control loop never
+# blocks on SQLite I/O. Reads see committed rows only, so history can trail the
+# loop by up to LOG_FLUSH_INTERVAL_S; call flush_readings() where that matters.
+LOG_BATCH_SIZE = 64
+LOG_FLUSH_INTERVAL_S = 5.0
+LOG_QUEUE_SIZE = 10000
+# A full queue is reported at most this often, with the number of rows dropped
+DROP_LOG_INTERVAL_S = 1.0
+
+# Read-only connections shared by web request threads (Flask runs threaded=True,
+# so thread-local connections would be opened and configured per request).
+READ_POOL_SIZE = 4
+# How long a read waits for a pooled connection before opening a temporary one
+READ_POOL_TIMEOUT_S = 1.0
+
+# Rows fetched per step when streaming history to the web client
+HISTORY_CHUNK_SIZE = 128
+
+# Database(':memory:') names each in-memory database uniquely so its writer and
+# pooled readers share one shared-cache instance instead of each getting its own
+_memory_db_ids = count()
+
+# Writer-queue marker; flush requests are queued as threading.Event objects
+_STOP = object()
+
+# lux_history.timestamp is stored as INTEGER milliseconds since the epoch;
+# rows are returned with the timestamp converted back to float seconds.
+_LUX_COLUMNS = """
+    id, timestamp / 1000.0 AS timestamp, raw_lux, clamped_lux, pwm_value,
+    mode, bounds_min, bounds_max
+"""
+
+_LUX_HISTORY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER NOT NULL,
+        raw_lux INTEGER NOT NULL,
+        clamped_lux INTEGER NOT NULL,
+        pwm_value INTEGER NOT NULL,
+        mode TEXT NOT NULL,
+        bounds_min INTEGER,
+        bounds_max INTEGER
+    )
+"""
+
+_LUX_INSERT_SQL = """
+    INSERT INTO lux_history
+    (timestamp, raw_lux, clamped_lux, pwm_value, mode, bounds_min, bounds_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SPECTRAL_INSERT_SQL = """
+    INSERT INTO spectral_history
+    (timestamp, f1, f2, fz, f3, f4, f5, fy, f6, fxl, f7, f8, nir, clear,
+     gps_valid, gps_lat, gps_lon, gps_unix_time, sanity_flag)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 
 class Database:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
-        self._local = threading.local()
+        self._memory_uri = None
+        if db_path == ':memory:':
+            self._memory_uri = f"file:chamber-mem-{next(_memory_db_ids)}?mode=memory&cache=shared"
+        # Single write connection, shared by the writer thread and the
+        # synchronous setters under _write_lock
+        self._write_lock = threading.Lock()
+        self._write_conn = self._connect()
+        # Persistent cursor reused for the batched inserts
+        self._insert_cursor = self._write_conn.cursor()
+        self._readers: queue.LifoQueue = queue.LifoQueue(maxsize=READ_POOL_SIZE)
+        self._readers_created = 0
+        self._readers_lock = threading.Lock()
+        # In-memory copy of the system_state row; read every loop tick, written rarely
+        self._web_state = None
+        self._web_state_lock = threading.Lock()
+        # Orders setters so the cache matches the last committed row; the
+        # loop's getter never takes it, so a slow write can't stall a tick
+        self._web_state_set_lock = threading.Lock()
         self._init_db()
 
-    def _get_conn(self) -> sqlite3.Connection:
-        """Get thread-local database connection."""
-        if not hasattr(self._local, 'conn') or self._local.conn is None:
-            self._local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self._local.conn.row_factory = sqlite3.Row
-        return self._local.conn
+        self._q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._dropped_rows = 0
+        self._drop_logged_at = float('-inf')  # time.monotonic()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        """Open a configured connection.
+
+        Connections run in autocommit mode (isolation_level=None); write
+        transactions are opened explicitly by _write().
+        """
+        if self._memory_uri is not None:
+            conn = sqlite3.connect(self._memory_uri, uri=True, check_same_thread=False,
+                                   isolation_level=None, cached_statements=256)
+            if readonly:
+                # mode=ro can't be combined with mode=memory; read_uncommitted
+                # keeps readers from hitting shared-cache table locks
+                conn.execute("PRAGMA query_only=ON")
+                conn.execute("PRAGMA read_uncommitted=ON")
+        elif readonly:
+            uri = f"{Path(self.db_path).absolute().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   isolation_level=None, cached_statements=256)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   isolation_level=None, cached_statements=256)
+            # WAL so web reads don't block loop writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=67108864")
+        conn.execute("PRAGMA cache_size=-8000")
+        return conn
 
     @contextmanager
-    def _cursor(self):
-        """Context manager for database cursor."""
-        conn = self._get_conn()
-        cursor = conn.cursor()
+    def _write(self):
+        """Context manager for a write transaction (commit on success, rollback on error)."""
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute("BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def _reader(self):
+        """Check out a pooled read-only connection.
+
+        If the pool stays exhausted for READ_POOL_TIMEOUT_S, a temporary
+        connection is used and closed afterwards, so a read never hangs.
+        """
+        pooled = True
         try:
-            yield cursor
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._readers_lock:
+                create = self._readers_created < READ_POOL_SIZE
+                if create:
+                    self._readers_created += 1
+            if create:
+                conn = self._connect(readonly=True)
+            else:
+                try:
+                    conn = self._readers.get(timeout=READ_POOL_TIMEOUT_S)
+                except queue.Empty:
+                    print("[DB] Read pool exhausted, using a temporary connection")
+                    conn = self._connect(readonly=True)
+                    pooled = False
+        try:
+            yield conn
         finally:
-            cursor.close()
+            if pooled:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
+    def _fetchall(self, sql: str, params=()) -> list:
+        with self._reader() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _fetchone(self, sql: str, params=()) -> Optional[sqlite3.Row]:
+        with self._reader() as conn:
+            return conn.execute(sql, params).fetchone()
 
     def _init_db(self):
         """Initialize database tables."""
-        with self._cursor() as cursor:
+        with self._write() as conn:
             # Lux history table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS lux_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp REAL NOT NULL,
-                    raw_lux INTEGER NOT NULL,
-                    clamped_lux INTEGER NOT NULL,
-                    pwm_value INTEGER NOT NULL,
-                    mode TEXT NOT NULL,
-                    bounds_min INTEGER,
-                    bounds_max INTEGER
-                )
-            """)
+            conn.execute(_LUX_HISTORY_SCHEMA.format(name='lux_history'))
+            self._migrate_lux_timestamps(conn)
 
-            # Create index for faster time-based queries
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_lux_timestamp
-                ON lux_history(timestamp)
+            # Covering index: serves every time-range query, and get_stats
+            # aggregates from its pages without touching the table. A plain
+            # timestamp index would be a redundant prefix costing a b-tree
+            # update on every insert, so drop it from older databases.
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_lux_ts_cover
+                ON lux_history(timestamp, raw_lux, pwm_value)
             """)
+            conn.execute("DROP INDEX IF EXISTS idx_lux_timestamp")
 
             # System state table (single row)
-            cursor.execute("""
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS system_state (
                     id INTEGER PRIMARY KEY CHECK (id = 1),
                     web_manual_enabled INTEGER DEFAULT 0,
@@ -72,13 +214,13 @@ class Database:
             """)
 
             # Initialize system state if not exists
-            cursor.execute("""
+            conn.execute("""
                 INSERT OR IGNORE INTO system_state (id, web_manual_enabled, web_manual_pwm, updated_at)
                 VALUES (1, 0, 0, ?)
             """, (time.time(),))
 
             # Spectral history table — all 13 AS7343 channels per reading
-            cursor.execute("""
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS spectral_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     timestamp REAL NOT NULL,
@@ -94,13 +236,13 @@ class Database:
                     sanity_flag INTEGER DEFAULT 0
                 )
             """)
-            cursor.execute("""
+            conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_spectral_timestamp
                 ON spectral_history(timestamp)
             """)
 
             # Water control state table (single row)
-            cursor.execute("""
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS water_control (
                     id INTEGER PRIMARY KEY CHECK (id = 1),
                     mode TEXT DEFAULT 'manual',
@@ -110,166 +252,370 @@ class Database:
                     updated_at REAL
                 )
             """)
-            cursor.execute("""
+            conn.execute("""
                 INSERT OR IGNORE INTO water_control
                     (id, mode, manual_open, auto_interval_s, auto_duration_s, updated_at)
                 VALUES (1, 'manual', 0, 7200, 10, ?)
             """, (time.time(),))
 
+    @staticmethod
+    def _migrate_lux_timestamps(conn: sqlite3.Connection):
+        """One-shot rewrite of a legacy lux_history (REAL seconds) to INTEGER ms."""
+        columns = {row['name']: row['type'] for row in
+                   conn.execute("PRAGMA table_info(lux_history)")}
+        if columns.get('timestamp', '').upper() != 'REAL':
+            return
+        print("[DB] Migrating lux_history timestamps to INTEGER milliseconds")
+        conn.execute(_LUX_HISTORY_SCHEMA.format(name='lux_history_new'))
+        conn.execute("""
+            INSERT INTO lux_history_new
+            (id, timestamp, raw_lux, clamped_lux, pwm_value, mode, bounds_min, bounds_max)
+            SELECT id, CAST(ROUND(timestamp * 1000) AS INTEGER), raw_lux, clamped_lux,
+                   pwm_value, mode, bounds_min, bounds_max
+            FROM lux_history
+        """)
+        conn.execute("DROP TABLE lux_history")
+        conn.execute("ALTER TABLE lux_history_new RENAME TO lux_history")
+
+    def _enqueue(self, sql: str, params: tuple):
+        """Hand a write to the background writer without blocking."""
+        try:
+            self._q.put_nowait((sql, params))
+        except queue.Full:
+            # Count drops and report them once per interval, not once per row
+            self._dropped_rows += 1
+            now = time.monotonic()
+            if now - self._drop_logged_at >= DROP_LOG_INTERVAL_S:
+                print(f"[DB] Write queue full, dropped {self._dropped_rows} rows")
+                self._dropped_rows = 0
+                self._drop_logged_at = now
+
+    def _writer_loop(self):
+        """Drain queued writes and commit them in batched transactions."""
+        q = self._q
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL_S
+            # Rows are tuples; a flush Event or _STOP ends the batch early
+            while len(batch) < LOG_BATCH_SIZE and isinstance(batch[-1], tuple):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            rows = [item for item in batch if isinstance(item, tuple)]
+            try:
+                if rows:
+                    with self._write():
+                        for sql, group in groupby(rows, key=itemgetter(0)):
+                            self._insert_cursor.executemany(sql, [params for _, params in group])
+            except Exception as exc:
+                print(f"[DB] Writer error, {len(rows)} rows lost: {exc}")
+            finally:
+                # Wake the flush_readings() caller whose marker ended this batch
+                if isinstance(batch[-1], threading.Event):
+                    batch[-1].set()
+
+            if batch[-1] is _STOP:
+                break
+
     def log_reading(self, raw_lux: int, clamped_lux: int, pwm_value: int,
                     mode: str, bounds_min: int, bounds_max: int):
-        """Log a lux reading to history."""
-        with self._cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO lux_history
-                (timestamp, raw_lux, clamped_lux, pwm_value, mode, bounds_min, bounds_max)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (time.time(), raw_lux, clamped_lux, pwm_value, mode, bounds_min, bounds_max))
+        """Queue a lux reading for the background writer."""
+        self._enqueue(_LUX_INSERT_SQL, (int(time.time() * 1000), raw_lux, clamped_lux,
+                                        pwm_value, mode, bounds_min, bounds_max))
+
+    def log_readings_batch(self, rows) -> int:
+        """Insert many lux readings in one transaction, bypassing the queue.
+
+        Each row is (raw_lux, clamped_lux, pwm_value, mode, bounds_min,
+        bounds_max); all rows share the current timestamp. Readings already
+        queued by log_reading are committed first so insert order is kept.
+        """
+        ts = int(time.time() * 1000)
+        params = [(ts, *row) for row in rows]
+        self.flush_readings()
+        with self._write():
+            self._insert_cursor.executemany(_LUX_INSERT_SQL, params)
+        return len(params)
+
+    def flush_readings(self):
+        """Block until every write queued before this call has been committed.
+
+        Rows the control loop queues afterwards don't extend the wait; the
+        writer wakes this caller as soon as it commits the batch ending in
+        this call's marker.
+        """
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._q.put(done)
+        done.wait()
+
+    @staticmethod
+    def _history_query(start_time: Optional[float], end_time: Optional[float],
+                       limit: int):
+        """SQL for the newest `limit` rows in range, returned oldest-first."""
+        query = f"SELECT {_LUX_COLUMNS} FROM lux_history WHERE 1=1"
+        params = []
+
+        if start_time:
+            query += " AND timestamp >= ?"
+            params.append(int(start_time * 1000))
+        if end_time:
+            query += " AND timestamp <= ?"
+            params.append(int(end_time * 1000))
+
+        # Qualified so SQLite walks the timestamp index rather than sorting on
+        # the seconds alias from _LUX_COLUMNS
+        query += " ORDER BY lux_history.timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return f"SELECT * FROM ({query}) ORDER BY timestamp, id", params
 
     def get_history(self, start_time: Optional[float] = None,
                     end_time: Optional[float] = None,
                     limit: int = 1000) -> List[Dict[str, Any]]:
         """Get lux history within time range."""
-        with self._cursor() as cursor:
-            query = "SELECT * FROM lux_history WHERE 1=1"
-            params = []
+        query, params = self._history_query(start_time, end_time, limit)
+        return [dict(row) for row in self._fetchall(query, params)]
+
+    def get_history_since(self, since: float, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get up to `limit` rows strictly newer than `since`, oldest-first.
+
+        Pages forward from a client cursor; the timestamp index lets the scan
+        stop after `limit` rows.
+        """
+        rows = self._fetchall(f"""
+            SELECT {_LUX_COLUMNS} FROM lux_history
+            WHERE lux_history.timestamp > ?
+            ORDER BY lux_history.timestamp, id LIMIT ?
+        """, (round(since * 1000), limit))
+        return [dict(row) for row in rows]
+
+    def get_history_version(self, start_time: Optional[float] = None,
+                            limit: Optional[int] = None) -> str:
+        """Cheap token that changes whenever the matching history result would.
+
+        Rows are only appended (or aged out), so the newest timestamp plus the
+        number of in-range rows, capped at `limit`, identifies the result of
+        get_history(start_time, limit). Without start_time only the newest
+        timestamp is used, which is enough for forward-only cursors.
 
-            if start_time:
-                query += " AND timestamp >= ?"
-                params.append(start_time)
-            if end_time:
-                query += " AND timestamp <= ?"
-                params.append(end_time)
+        Like the other reads it only sees committed rows, so rows still queued
+        change the token within LOG_FLUSH_INTERVAL_S.
+        """
+        newest = self._fetchone("SELECT MAX(timestamp) FROM lux_history")[0]
+        if start_time is None:
+            return str(newest)
+        count = self._fetchone("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM lux_history WHERE timestamp >= ? LIMIT ?
+            )
+        """, (int(start_time * 1000), limit if limit is not None else -1))[0]
+        return f"{newest}-{count}"
 
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
+    def iter_history(self, start_time: Optional[float] = None,
+                     end_time: Optional[float] = None,
+                     limit: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Like get_history, but yields rows in chunks of HISTORY_CHUNK_SIZE.
 
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+        Each chunk is a separate keyset query on (timestamp, id), so no read
+        connection or snapshot is held while the caller consumes a chunk. The
+        range is fixed up front, so rows committed mid-stream are not included.
+        """
+        where, params = "1=1", []
+        if start_time:
+            where += " AND timestamp >= ?"
+            params.append(int(start_time * 1000))
+        if end_time:
+            where += " AND timestamp <= ?"
+            params.append(int(end_time * 1000))
+        with self._reader() as conn:
+            last = conn.execute(f"""
+                SELECT timestamp, id FROM lux_history WHERE {where}
+                ORDER BY timestamp DESC, id DESC LIMIT 1
+            """, params).fetchone()
+            first = conn.execute(f"""
+                SELECT timestamp, id FROM (
+                    SELECT timestamp, id FROM lux_history WHERE {where}
+                    ORDER BY timestamp DESC, id DESC LIMIT ?
+                ) ORDER BY timestamp, id LIMIT 1
+            """, (*params, limit)).fetchone()
+        if last is None:
+            return
 
-            return [dict(row) for row in reversed(rows)]
+        # Exclusive lower key: (ts, id) > (t, i - 1) starts at the first row
+        key = (first['timestamp'], first['id'] - 1)
+        end = (last['timestamp'], last['id'])
+        while True:
+            with self._reader() as conn:
+                rows = conn.execute(f"""
+                    SELECT {_LUX_COLUMNS} FROM lux_history
+                    WHERE (lux_history.timestamp, id) > (?, ?)
+                      AND (lux_history.timestamp, id) <= (?, ?)
+                    ORDER BY lux_history.timestamp, id LIMIT ?
+                """, (*key, *end, HISTORY_CHUNK_SIZE)).fetchall()
+            if not rows:
+                return
+            chunk = [dict(row) for row in rows]
+            # The seconds alias can't be reused as a key; map back to ms
+            key = (round(chunk[-1]['timestamp'] * 1000), chunk[-1]['id'])
+            yield chunk
+            if len(rows) < HISTORY_CHUNK_SIZE:
+                return
 
     def get_latest_reading(self) -> Optional[Dict[str, Any]]:
         """Get the most recent reading."""
-        with self._cursor() as cursor:
-            cursor.execute("""
-                SELECT * FROM lux_history
-                ORDER BY timestamp DESC LIMIT 1
-            """)
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        row = self._fetchone(f"""
+            SELECT {_LUX_COLUMNS} FROM lux_history
+            ORDER BY lux_history.timestamp DESC LIMIT 1
+        """)
+        return dict(row) if row else None
 
     def get_web_control_state(self) -> Dict[str, Any]:
-        """Get web manual control state."""
-        with self._cursor() as cursor:
-            cursor.execute("SELECT * FROM system_state WHERE id = 1")
-            row = cursor.fetchone()
-            if row:
-                return {
-                    'web_manual_enabled': bool(row['web_manual_enabled']),
-                    'web_manual_pwm': row['web_manual_pwm'],
-                    'updated_at': row['updated_at']
-                }
-            return {'web_manual_enabled': False, 'web_manual_pwm': 0, 'updated_at': None}
+        """Get web manual control state (cached; SQLite is read only on first call)."""
+        with self._web_state_lock:
+            if self._web_state is None:
+                self._web_state = self._load_web_control_state()
+            return dict(self._web_state)
+
+    def _load_web_control_state(self) -> Dict[str, Any]:
+        row = self._fetchone("SELECT * FROM system_state WHERE id = 1")
+        if row:
+            return {
+                'web_manual_enabled': bool(row['web_manual_enabled']),
+                'web_manual_pwm': row['web_manual_pwm'],
+                'updated_at': row['updated_at']
+            }
+        return {'web_manual_enabled': False, 'web_manual_pwm': 0, 'updated_at': None}
 
     def set_web_control_state(self, enabled: bool, pwm_value: int):
         """Set web manual control state."""
-        with self._cursor() as cursor:
-            cursor.execute("""
-                UPDATE system_state
-                SET web_manual_enabled = ?, web_manual_pwm = ?, updated_at = ?
-                WHERE id = 1
-            """, (int(enabled), pwm_value, time.time()))
+        now = time.time()
+        state = {
+            'web_manual_enabled': bool(enabled),
+            'web_manual_pwm': pwm_value,
+            'updated_at': now,
+        }
+        with self._web_state_set_lock:
+            with self._write() as conn:
+                conn.execute("""
+                    UPDATE system_state
+                    SET web_manual_enabled = ?, web_manual_pwm = ?, updated_at = ?
+                    WHERE id = 1
+                """, (int(enabled), pwm_value, now))
+            with self._web_state_lock:
+                self._web_state = state
 
     def cleanup_old_data(self, max_age_hours: int = 168):
-        """Delete data older than max_age_hours (default 7 days)."""
+        """Delete data older than max_age_hours (default 7 days).
+
+        Also checkpoints the WAL back into the main file and truncates it, so
+        the -wal file stays bounded and reads don't merge days of WAL pages.
+        """
         cutoff = time.time() - (max_age_hours * 3600)
-        with self._cursor() as cursor:
-            cursor.execute("DELETE FROM lux_history WHERE timestamp < ?", (cutoff,))
-            return cursor.rowcount
+        self.flush_readings()
+        with self._write() as conn:
+            deleted = conn.execute("DELETE FROM lux_history WHERE timestamp < ?",
+                                   (int(cutoff * 1000),)).rowcount
+        with self._write_lock:
+            self._write_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
 
     def get_stats(self, hours: int = 24) -> Dict[str, Any]:
-        """Get statistics for the last N hours."""
+        """Get statistics for the last N hours (aggregated inside SQLite)."""
         start_time = time.time() - (hours * 3600)
-        with self._cursor() as cursor:
-            cursor.execute("""
-                SELECT
-                    COUNT(*) as count,
-                    AVG(raw_lux) as avg_lux,
-                    MIN(raw_lux) as min_lux,
-                    MAX(raw_lux) as max_lux,
-                    AVG(pwm_value) as avg_pwm
-                FROM lux_history
-                WHERE timestamp >= ?
-            """, (start_time,))
-            row = cursor.fetchone()
-            return dict(row) if row else {}
+        row = self._fetchone("""
+            SELECT
+                COUNT(*) as count,
+                AVG(raw_lux) as avg_lux,
+                MIN(raw_lux) as min_lux,
+                MAX(raw_lux) as max_lux,
+                AVG(pwm_value) as avg_pwm
+            FROM lux_history
+            WHERE timestamp >= ?
+        """, (int(start_time * 1000),))
+        return dict(row) if row else {}
 
     def log_spectral(self, channels: dict, gps: dict, sanity_flag: bool):
-        """Log a full spectral reading with GPS and sanity flag."""
-        with self._cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO spectral_history
-                (timestamp, f1, f2, fz, f3, f4, f5, fy, f6, fxl, f7, f8, nir, clear,
-                 gps_valid, gps_lat, gps_lon, gps_unix_time, sanity_flag)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                time.time(),
-                channels.get('f1', 0), channels.get('f2', 0), channels.get('fz', 0),
-                channels.get('f3', 0), channels.get('f4', 0), channels.get('f5', 0),
-                channels.get('fy', 0), channels.get('f6', 0), channels.get('fxl', 0),
-                channels.get('f7', 0), channels.get('f8', 0), channels.get('nir', 0),
-                channels.get('clear', 0),
-                int(gps.get('valid', False)),
-                gps.get('latitude', 0.0), gps.get('longitude', 0.0),
-                gps.get('unix_time', 0),
-                int(sanity_flag),
-            ))
+        """Queue a full spectral reading with GPS and sanity flag."""
+        self._enqueue(_SPECTRAL_INSERT_SQL, (
+            time.time(),
+            channels.get('f1', 0), channels.get('f2', 0), channels.get('fz', 0),
+            channels.get('f3', 0), channels.get('f4', 0), channels.get('f5', 0),
+            channels.get('fy', 0), channels.get('f6', 0), channels.get('fxl', 0),
+            channels.get('f7', 0), channels.get('f8', 0), channels.get('nir', 0),
+            channels.get('clear', 0),
+            int(gps.get('valid', False)),
+            gps.get('latitude', 0.0), gps.get('longitude', 0.0),
+            gps.get('unix_time', 0),
+            int(sanity_flag),
+        ))
 
     def get_spectral_history(self, hours: float = 6, limit: int = 500) -> List[Dict[str, Any]]:
         """Get spectral history for the last N hours."""
         start_time = time.time() - (hours * 3600)
-        with self._cursor() as cursor:
-            cursor.execute("""
-                SELECT * FROM spectral_history
-                WHERE timestamp >= ?
-                ORDER BY timestamp DESC LIMIT ?
-            """, (start_time, limit))
-            rows = cursor.fetchall()
-            return [dict(row) for row in reversed(rows)]
+        rows = self._fetchall("""
+            SELECT * FROM spectral_history
+            WHERE timestamp >= ?
+            ORDER BY timestamp DESC LIMIT ?
+        """, (start_time, limit))
+        return [dict(row) for row in reversed(rows)]
 
     def get_water_control_state(self) -> Dict[str, Any]:
         """Get water control state."""
-        with self._cursor() as cursor:
-            cursor.execute("SELECT * FROM water_control WHERE id = 1")
-            row = cursor.fetchone()
-            if row:
-                return {
-                    'mode': row['mode'],
-                    'manual_open': bool(row['manual_open']),
-                    'auto_interval_s': row['auto_interval_s'],
-                    'auto_duration_s': row['auto_duration_s'],
-                    'updated_at': row['updated_at'],
-                }
-            return {'mode': 'manual', 'manual_open': False,
-                    'auto_interval_s': 7200, 'auto_duration_s': 10, 'updated_at': None}
+        row = self._fetchone("SELECT * FROM water_control WHERE id = 1")
+        if row:
+            return {
+                'mode': row['mode'],
+                'manual_open': bool(row['manual_open']),
+                'auto_interval_s': row['auto_interval_s'],
+                'auto_duration_s': row['auto_duration_s'],
+                'updated_at': row['updated_at'],
+            }
+        return {'mode': 'manual', 'manual_open': False,
+                'auto_interval_s': 7200, 'auto_duration_s': 10, 'updated_at': None}
 
     def set_water_control_state(self, mode: str, manual_open: bool,
                                 auto_interval_s: int, auto_duration_s: int):
         """Update water control state."""
-        with self._cursor() as cursor:
-            cursor.execute("""
+        with self._write() as conn:
+            conn.execute("""
                 UPDATE water_control
                 SET mode = ?, manual_open = ?, auto_interval_s = ?, auto_duration_s = ?, updated_at = ?
                 WHERE id = 1
             """, (mode, int(manual_open), auto_interval_s, auto_duration_s, time.time()))
 
     def close(self):
-        """Close database connection."""
-        if hasattr(self._local, 'conn') and self._local.conn:
-            self._local.conn.close()
-            self._local.conn = None
+        """Stop the writer (committing queued rows) and close all connections."""
+        if self._writer.is_alive():
+            self._q.put(_STOP)
+            self._writer.join()
+        with self._write_lock:
+            self._insert_cursor.close()
+            self._write_conn.execute("PRAGMA optimize")
+            self._write_conn.close()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# Global database instance, opened on first access (`from database import db`)
+# rather than at import, so tests can point DB_PATH elsewhere first
+_db = None
+_db_lock = threading.Lock()
 
 
-# Global database instance
-db = Database()
\ No newline at end of file
+def __getattr__(name):
+    global _db
+    if name == 'db':
+        with _db_lock:
+            if _db is None:
+                _db = Database(DB_PATH)
+        return _db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,5 @@
+from array import array
+
 import RPi.GPIO as GPIO
 from rpi_hardware_pwm import HardwarePWM
 
@@ -23,8 +25,10 @@ class IOController:
         self.sw2 = True
         self.lux_value = 0
 
-        # Bounds buffer (1 minute of lux history)
-        self.lux_buffer = [0] * LUX_BUFFER_SIZE
+        # Bounds buffer (1 minute of lux history), packed C ints rather than a
+        # list of int objects. Signed 32-bit rather than uint16 so a garbled
+        # wired reading can't raise OverflowError on store.
+        self.lux_buffer = array('i', bytes(4 * LUX_BUFFER_SIZE))
         self.buffer_index = 0
         self.buffer_count = 0
         self.live_min = 0
@@ -38,7 +42,11 @@ class IOController:
         # Hardware handles
         self.lora = None
         self._pwm = None  # rpi-hardware-pwm instance for BCM 12 (PWM0)
+        # Duty-cycle percent for every PWM value, so set_pwm is a single lookup
+        self._duty_lut = [i * (100.0 / MAX_PWM_VALUE) for i in range(MAX_PWM_VALUE + 1)]
+        self._last_pwm = None  # last value written, so unchanged ticks skip sysfs
         self.rs = RS485Receiver()
+        self._was_wired = False  # previous tick's link, to catch LoRa → wired switches
         self.rotary = RotaryEncoder(ROTARY_A_PIN, ROTARY_B_PIN, ROTARY_BTN_PIN)
 
         # YLW LED flash counter: set to N on packet receipt, decremented each update
@@ -97,6 +105,7 @@ class IOController:
         try:
             self._pwm = HardwarePWM(pwm_channel=0, hz=PWM_FREQ, chip=0)
             self._pwm.start(0)
+            self._last_pwm = 0
             self.status['pwm'] = f"OK - hardware PWM on BCM{PWM_PIN} at {PWM_FREQ} Hz (sysfs)"
             self.hardware_ready['pwm'] = True
         except Exception as exc:
@@ -169,9 +178,13 @@ class IOController:
         # path: is_connected() → rs485_send, else → LoRa.
         wired = self.rs.is_connected()
         if wired:
+            if not self._was_wired:
+                # Bytes that arrived while on LoRa are stale; don't replay them
+                self.rs.discard_input()
             self._read_rs485()
         else:
             self._read_lora()
+        self._was_wired = wired
 
         self._update_leds()
 
@@ -249,13 +262,16 @@ class IOController:
         """Set PWM duty cycle (0-1023 maps to 0-100%).
 
         Delegates to hardware PWM peripheral via sysfs — continues at this
-        duty cycle even if the Python process hangs between calls.
+        duty cycle even if the Python process hangs between calls. A value
+        equal to the last one written is skipped.
         """
         if not self.hardware_ready['pwm'] or self._pwm is None:
             return
-        duty = (value / MAX_PWM_VALUE) * 100.0
-        duty = max(0.0, min(100.0, duty))
-        self._pwm.change_duty_cycle(duty)
+        v = 0 if value < 0 else (MAX_PWM_VALUE if value > MAX_PWM_VALUE else int(value))
+        if v == self._last_pwm:
+            return
+        self._pwm.change_duty_cycle(self._duty_lut[v])
+        self._last_pwm = v
 
     def set_solenoid(self, on: bool):
         """Open (True) or close (False) the solenoid valve."""
@@ -294,18 +310,29 @@ class IOController:
     def get_init_report(self):
         return dict(self.status)
 
+    def reset(self):
+        """Clear the lux window and all derived bounds, reusing the buffer."""
+        buf = self.lux_buffer
+        memoryview(buf).cast('B')[:] = bytes(buf.itemsize * len(buf))
+        self.buffer_index = 0
+        self.buffer_count = 0
+        self.live_min = 0
+        self.live_max = 0
+        self.frozen_min = 0
+        self.frozen_max = 0
+        self._samples_since_freeze = 0
+
     def _update_bounds(self):
         """Recalculate min/max from buffer."""
         if self.buffer_count == 0:
             return
 
-        self.live_min = self.lux_buffer[0]
-        self.live_max = self.lux_buffer[0]
-        for i in range(1, self.buffer_count):
-            if self.lux_buffer[i] < self.live_min:
-                self.live_min = self.lux_buffer[i]
-            if self.lux_buffer[i] > self.live_max:
-                self.live_max = self.lux_buffer[i]
+        # One C-level pass each over the packed buffer; order doesn't matter
+        buf = self.lux_buffer
+        if self.buffer_count < len(buf):
+            buf = buf[:self.buffer_count]
+        self.live_min = min(buf)
+        self.live_max = max(buf)
 
     def get_clamped_lux(self, raw_lux):
         """Get lux clamped to the previous minute's frozen bounds.
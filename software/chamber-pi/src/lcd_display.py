@@ -44,6 +44,13 @@ class LCDDisplay:
         self.bus = None
         self.available = False
         self.status = 'Not initialized'
+        # Mirror of what is on the glass, so write_line only sends changed cells
+        self._shadow = [[' '] * cols for _ in range(rows)]
+        # Last text passed to write_line per row; a repeat returns before any
+        # padding or per-character diffing
+        self._row_text = [None] * rows
+        self._cursor_col = 0
+        self._cursor_row = 0
 
     def begin(self):
         """Initialize the LCD display if it is present on the I2C bus."""
@@ -113,6 +120,11 @@ class LCDDisplay:
         try:
             self._command(LCD_CLEARDISPLAY)
             time.sleep(0.002)
+            for line in self._shadow:
+                line[:] = [' '] * self.cols
+            self._row_text = [None] * self.rows
+            self._cursor_col = 0
+            self._cursor_row = 0
         except Exception as exc:
             self._io_error(exc)
 
@@ -124,6 +136,8 @@ class LCDDisplay:
             if row >= self.rows:
                 row = self.rows - 1
             self._command(LCD_SETDDRAMADDR | (col + row_offsets[row]))
+            self._cursor_col = col
+            self._cursor_row = row
         except Exception as exc:
             self._io_error(exc)
 
@@ -131,11 +145,39 @@ class LCDDisplay:
         if not self.available:
             return
         try:
-            for char in str(text):
-                self._write(ord(char))
+            text = str(text)
+            frames = []
+            for char in text:
+                frames += self._byte_frames(ord(char), RS)
+            if frames:
+                self._transfer(frames)
+            self._row_text[self._cursor_row] = None
+            line = self._shadow[self._cursor_row]
+            for char in text:
+                if self._cursor_col < self.cols:
+                    line[self._cursor_col] = char
+                self._cursor_col += 1
         except Exception as exc:
             self._io_error(exc)
 
+    def write_line(self, row, text):
+        """Show text on a row, padded/truncated to the display width.
+
+        Only the span between the first and last changed character is sent,
+        so an unchanged row costs no I2C traffic at all.
+        """
+        if not self.available or text == self._row_text[row]:
+            return
+        padded = f"{text:<{self.cols}}"[:self.cols]
+        line = self._shadow[row]
+        changed = [i for i in range(self.cols) if line[i] != padded[i]]
+        if changed:
+            first, last = changed[0], changed[-1]
+            self.set_cursor(first, row)
+            self.print(padded[first:last + 1])
+        if self.available:
+            self._row_text[row] = text
+
     def set_backlight(self, state):
         if not self.available:
             return
@@ -151,30 +193,39 @@ class LCDDisplay:
     def _command(self, cmd):
         self._send(cmd, 0)
 
-    def _write(self, value):
-        self._send(value, RS)
-
     def _send(self, data, mode):
+        self._transfer(self._byte_frames(data, mode))
+
+    def _byte_frames(self, data, mode):
+        """Expander bytes for one HD44780 byte: two nibbles, each with an EN pulse."""
         high = data & 0xF0
         low = (data << 4) & 0xF0
-        self._write4bits(high | mode)
-        self._write4bits(low | mode)
+        return self._nibble_frames(high | mode) + self._nibble_frames(low | mode)
+
+    def _nibble_frames(self, data):
+        bl = self.backlight
+        return [data | bl, data | EN | bl, (data & ~EN) | bl]
+
+    def _transfer(self, frames):
+        """Send expander bytes as a single I2C write message.
+
+        At 100 kHz each byte takes ~90 us on the wire, which already exceeds the
+        EN pulse width and per-command execution time, so no sleeps are needed
+        between bytes within a message.
+        """
+        if self.bus is None:
+            raise RuntimeError('I2C bus is not open')
+        self.bus.i2c_rdwr(smbus2.i2c_msg.write(self.address, frames))
 
     def _write4bits(self, data):
-        self._expander_write(data)
-        self._pulse_enable(data)
+        self._transfer(self._nibble_frames(data))
+        time.sleep(0.00005)
 
     def _expander_write(self, data):
         if self.bus is None:
             raise RuntimeError('I2C bus is not open')
         self.bus.write_byte(self.address, data | self.backlight)
 
-    def _pulse_enable(self, data):
-        self._expander_write(data | EN)
-        time.sleep(0.000001)
-        self._expander_write(data & ~EN)
-        time.sleep(0.00005)
-
     def cleanup(self):
         if self.bus:
             try:
@@ -30,6 +30,13 @@ _IRQ_CRC_ERR = 0x0040
 
 _REG_SYNC_MSB = 0x0740
 
+# Fixed command frames used by poll(), packed once instead of rebuilt per call
+_FRAME_GET_STATUS        = (_CMD_GET_STATUS, 0x00)
+_FRAME_GET_IRQ_STATUS    = (_CMD_GET_IRQ_STATUS, 0x00, 0x00, 0x00)
+_FRAME_GET_PACKET_STATUS = (_CMD_GET_PACKET_STATUS, 0x00, 0x00, 0x00, 0x00)
+_FRAME_GET_RX_BUF_STATUS = (_CMD_GET_RX_BUF_STATUS, 0x00, 0x00, 0x00)
+_FRAME_SET_RX_CONTINUOUS = (_CMD_SET_RX, 0xFF, 0xFF, 0xFF)
+
 _CHIP_MODES = {2: 'STDBY_RC', 3: 'STDBY_XOSC', 4: 'TX', 5: 'RX', 6: 'CAD'}
 
 # ---------------------------------------------------------------------------
@@ -93,6 +100,8 @@ class LoRaReceiver:
         self._dio1       = dio1_pin
         self._spi        = None
         self._irq_mask   = _IRQ_RX_DONE | _IRQ_CRC_ERR
+        self._frame_clear_irq = (_CMD_CLEAR_IRQ,
+                                 (self._irq_mask >> 8) & 0xFF, self._irq_mask & 0xFF)
         self._pkt_count  = 0
         self._last_beat  = 0.0
 
@@ -176,7 +185,7 @@ class LoRaReceiver:
         """
         now = time.time()
         if now - self._last_beat >= 1.0:
-            r        = self._cmd(_CMD_GET_STATUS, [0x00])
+            r        = self._xfer(_FRAME_GET_STATUS)
             mode     = (r[1] >> 4) & 0x07
             mode_str = _CHIP_MODES.get(mode, f'unknown({mode})')
             print(f"[LoRa] {now:.1f}  mode={mode_str:<12}  pkts={self._pkt_count}")
@@ -186,42 +195,45 @@ class LoRaReceiver:
             return None
 
         # Response: [status(during opcode), NOP, IRQ[15:8], IRQ[7:0]]
-        r         = self._cmd(_CMD_GET_IRQ_STATUS, [0x00, 0x00, 0x00])
+        r         = self._xfer(_FRAME_GET_IRQ_STATUS)
         irq_flags = (r[2] << 8) | r[3]
-        self._cmd(_CMD_CLEAR_IRQ, [(self._irq_mask >> 8) & 0xFF, self._irq_mask & 0xFF])
+        self._xfer(self._frame_clear_irq)
 
         # Get RSSI/SNR before clearing IRQ
         # Response: [status(during opcode), NOP, RssiPkt, SnrPkt, SignalRssiPkt]
-        ps   = self._cmd(_CMD_GET_PACKET_STATUS, [0x00, 0x00, 0x00, 0x00])
+        ps   = self._xfer(_FRAME_GET_PACKET_STATUS)
         rssi = -ps[2] / 2.0
-        snr  = struct.unpack('b', bytes([ps[3]]))[0] / 4.0
+        snr  = (ps[3] - 256 if ps[3] > 127 else ps[3]) / 4.0   # int8
 
         if irq_flags & _IRQ_CRC_ERR:
             print(f"[LoRa] CRC ERR  RSSI={rssi:.1f} dBm  SNR={snr:.1f} dB")
-            self._cmd(_CMD_SET_RX, [0xFF, 0xFF, 0xFF])
+            self._xfer(_FRAME_SET_RX_CONTINUOUS)
             return b''
 
         if not (irq_flags & _IRQ_RX_DONE):
-            self._cmd(_CMD_SET_RX, [0xFF, 0xFF, 0xFF])
+            self._xfer(_FRAME_SET_RX_CONTINUOUS)
             return None
 
         # Response: [status(during opcode), NOP, PayloadLen, BufOffset]
-        r          = self._cmd(_CMD_GET_RX_BUF_STATUS, [0x00, 0x00, 0x00])
+        r          = self._xfer(_FRAME_GET_RX_BUF_STATUS)
         pkt_len    = r[2]
         buf_offset = r[3]
 
         if pkt_len == 0:
-            self._cmd(_CMD_SET_RX, [0xFF, 0xFF, 0xFF])
+            self._xfer(_FRAME_SET_RX_CONTINUOUS)
             return None
 
         # ReadBuffer: [cmd, offset, NOP(status), data × pkt_len]
-        raw     = self._cmd(_CMD_READ_BUFFER, [buf_offset] + [0x00] * (pkt_len + 1))
-        payload = bytes(raw[3: 3 + pkt_len])
+        frame      = bytearray(pkt_len + 3)
+        frame[0]   = _CMD_READ_BUFFER
+        frame[1]   = buf_offset
+        raw        = self._xfer(frame)
+        payload    = bytes(raw[3: 3 + pkt_len])
 
         self._pkt_count += 1
         print(f"[LoRa] RX DONE  len={pkt_len:3d}  RSSI={rssi:.1f} dBm  SNR={snr:.1f} dB  pkts={self._pkt_count}")
 
-        self._cmd(_CMD_SET_RX, [0xFF, 0xFF, 0xFF])   # re-arm
+        self._xfer(_FRAME_SET_RX_CONTINUOUS)   # re-arm
         return payload
 
     def close(self):
@@ -240,12 +252,16 @@ class LoRaReceiver:
                 raise TimeoutError("SX1262 BUSY pin did not clear within timeout")
             time.sleep(0.001)
 
-    def _cmd(self, opcode: int, params: list = None) -> list:
+    def _xfer(self, frame) -> list:
+        """Send a pre-built command frame (opcode + params) and return the response."""
         self._wait_busy()
-        r = self._spi.xfer2([opcode] + (params or []))
+        r = self._spi.xfer2(frame)
         self._wait_busy()
         return r
 
+    def _cmd(self, opcode: int, params: list = None) -> list:
+        return self._xfer([opcode] + (params or []))
+
     def _write_reg(self, addr: int, data: list):
         self._wait_busy()
         self._spi.xfer2([_CMD_WRITE_REGISTER, (addr >> 8) & 0xFF, addr & 0xFF] + data)
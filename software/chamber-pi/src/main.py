@@ -24,16 +24,8 @@ lcd = LCDDisplay()
 pwm_enabled   = False
 running       = True
 last_knob_pos = 0       # previous encoder position for delta tracking
-_lcd_cache    = ['', '', '', '']  # last-written content per row; skip write if unchanged
-
-
-def lcd_row(row: int, text: str):
-    """Write text to an LCD row only if the content has changed."""
-    padded = f"{text:<{LCD_COLS}}"[:LCD_COLS]
-    if padded != _lcd_cache[row]:
-        _lcd_cache[row] = padded
-        lcd.set_cursor(0, row)
-        lcd.print(padded)
+status_tick   = 0       # ticks since the last console status line
+cleanup_timer = None    # pending threading.Timer for the hourly DB cleanup
 
 
 def signal_handler(sig, frame):
@@ -79,11 +71,44 @@ def setup():
     register_solenoid_setter(io.set_solenoid)
 
 
+# Control modes as logged to the database and reported to the web UI
+MODE_AUTO   = 'auto'
+MODE_MANUAL = 'manual'
+
 _KNOB_STEP = 10  # PWM units per encoder detent in manual mode
+_CLEANUP_INTERVAL_S = 3600  # purge data older than 7 days once an hour
+_STATUS_PRINT_TICKS = 10  # console status line once per second at 100 ms/tick
+
+# Fixed LCD fragments, built once instead of re-formatted every tick.
+# Static rows are pre-padded to LCD_COLS so write_line can diff them directly.
+_LCD_MODE   = {True: "Mode:MANUAL", False: "Mode:AUTO  "}
+_LCD_CONN   = {True: "[WIRE]", False: "[LORA]"}
+# Row 0 is a (manual, wired) header plus the duty percentage for the PWM value
+_LCD_HEADER = {(manual, wired): f"{_LCD_MODE[manual]} {_LCD_CONN[wired]} "
+               for manual in (True, False) for wired in (True, False)}
+_LCD_DUTY   = [f"{int((pwm / MAX_PWM_VALUE) * 100.0):>3}%" for pwm in range(MAX_PWM_VALUE + 1)]
+_LCD_NO_GPS = f"{'NO GPS':<{LCD_COLS}}"
+_LCD_NO_SAT = f"{'NO SAT TIME':<{LCD_COLS}}"
+
+
+def compute_pwm(clamped_lux: int, pwm_enabled: bool,
+                web_manual_enabled: bool, web_manual_pwm: int) -> tuple[int, str]:
+    """Pick the PWM output and mode label for this tick (pure, no I/O).
+
+    Lux maps linearly onto 0..MAX_PWM_VALUE with SCALE_CONSTANT as full scale,
+    rounded half-up in integer arithmetic.
+    """
+    if web_manual_enabled:
+        return web_manual_pwm, MODE_MANUAL
+    if not pwm_enabled or clamped_lux <= 0:
+        return 0, MODE_AUTO
+    if clamped_lux >= SCALE_CONSTANT:
+        return MAX_PWM_VALUE, MODE_AUTO
+    return (clamped_lux * MAX_PWM_VALUE * 2 + SCALE_CONSTANT) // (2 * SCALE_CONSTANT), MODE_AUTO
 
 
 def loop():
-    global pwm_enabled, last_knob_pos
+    global pwm_enabled, last_knob_pos, status_tick
 
     io.update()
 
@@ -130,38 +155,29 @@ def loop():
             unix_time=gps['unix_time'],
         )
 
-    actual_pwm = 0
-    actual_mode = 'auto'
-
-    if web_manual_enabled:
-        actual_pwm = web_manual_pwm
-        actual_mode = 'manual'
-    elif pwm_enabled:
-        input_norm = clamped_lux / SCALE_CONSTANT
-        input_norm = max(0.0, min(1.0, input_norm))
-        actual_pwm = int(input_norm * MAX_PWM_VALUE + 0.5)
-        actual_pwm = min(actual_pwm, MAX_PWM_VALUE)
+    actual_pwm, actual_mode = compute_pwm(clamped_lux, pwm_enabled,
+                                          web_manual_enabled, web_manual_pwm)
 
     io.set_pwm(actual_pwm)
 
-    if lcd.available:
-        conn_str     = "WIRE" if io.is_wired_connected() else "LORA"
-        duty_pct_int = int((actual_pwm / MAX_PWM_VALUE) * 100.0)
-        mode_str     = "MANUAL" if web_manual_enabled else "AUTO  "
+    wired = io.is_wired_connected()
 
-        lcd_row(0, f"Mode:{mode_str:<6} [{conn_str}] {duty_pct_int:>3}%")
-        lcd_row(1, f"Lux:{raw_lux:<7} PWM:{actual_pwm:<6}")
+    if lcd.available:
+        # Same clamp set_pwm applies; web_manual_pwm comes back from the DB unchecked
+        applied_pwm = 0 if actual_pwm < 0 else min(int(actual_pwm), MAX_PWM_VALUE)
+        lcd.write_line(0, _LCD_HEADER[web_manual_enabled, wired] + _LCD_DUTY[applied_pwm])
+        lcd.write_line(1, f"Lux:{raw_lux:<7} PWM:{actual_pwm:<6}")
 
         if gps.get('valid'):
-            lcd_row(2, f"{gps['latitude']:>9.4f} {gps['longitude']:>10.4f}")
+            lcd.write_line(2, f"{gps['latitude']:>9.4f} {gps['longitude']:>10.4f}")
         else:
-            lcd_row(2, "NO GPS")
+            lcd.write_line(2, _LCD_NO_GPS)
 
         if gps.get('valid') and gps.get('unix_time', 0) > 0:
             t = datetime.datetime.fromtimestamp(gps['unix_time'], tz=datetime.timezone.utc)
-            lcd_row(3, f"UTC {t.strftime('%H:%M:%S')}")
+            lcd.write_line(3, f"UTC {t.strftime('%H:%M:%S')}")
         else:
-            lcd_row(3, "NO SAT TIME")
+            lcd.write_line(3, _LCD_NO_SAT)
 
     db.log_reading(
         raw_lux=raw_lux,
@@ -188,33 +204,68 @@ def loop():
         sw1=sw1,
         sw2=sw2,
         sanity_flag=sanity_flag,
-        wired_connected=io.is_wired_connected(),
+        wired_connected=wired,
         gps=gps,
     )
 
-    duty_pct = (actual_pwm / MAX_PWM_VALUE) * 100.0
-    print(f"{io.to_string()} | [PWM] {actual_pwm}/{MAX_PWM_VALUE} ({duty_pct:.1f}%) mode={actual_mode}")
+    # A blocking stdout (serial console, journald) would stall the loop; only
+    # build and print the status line at 1 Hz.
+    status_tick += 1
+    if status_tick >= _STATUS_PRINT_TICKS:
+        status_tick = 0
+        duty_pct = (actual_pwm / MAX_PWM_VALUE) * 100.0
+        print(f"{io.to_string()} | [PWM] {actual_pwm}/{MAX_PWM_VALUE} ({duty_pct:.1f}%) mode={actual_mode}")
+
+
+def schedule_cleanup():
+    """Arm the next hourly cleanup on a background timer.
+
+    The DELETE and WAL checkpoint can take a while on an SD card, so they run
+    off the control loop thread.
+    """
+    global cleanup_timer
+    cleanup_timer = threading.Timer(_CLEANUP_INTERVAL_S, run_cleanup)
+    cleanup_timer.daemon = True
+    cleanup_timer.start()
+
+
+def run_cleanup():
+    try:
+        db.cleanup_old_data()
+    except Exception as e:
+        print(f"Cleanup error: {e}")
+    if running:
+        schedule_cleanup()
 
 
 def main_loop():
     global running
-    loop_delay = LOOP_DELAY_MS / 1000.0
-    # Purge data older than 7 days every ~1 hour (36000 ticks at 100 ms)
-    _cleanup_interval = 36000
-    _tick = 0
-
+    period = LOOP_DELAY_MS / 1000.0
+    # Bound once; these run every tick
+    tick = loop
+    sleep = time.sleep
+    now = time.monotonic
+
+    # Ticks are scheduled against a monotonic deadline so the loop period
+    # stays at LOOP_DELAY_MS instead of LOOP_DELAY_MS plus the tick's own work.
+    next_tick = now()
     while running:
         try:
-            loop()
-            _tick += 1
-            if _tick >= _cleanup_interval:
-                db.cleanup_old_data()
-                _tick = 0
-            time.sleep(loop_delay)
+            tick()
         except Exception as e:
             print(f"Loop error: {e}")
-            time.sleep(1)
+            sleep(1)
+            next_tick = now()
+            continue
+        next_tick += period
+        delay = next_tick - now()
+        if delay > 0:
+            sleep(delay)
+        else:
+            next_tick = now()  # overran; don't burst to catch up
 
+    if cleanup_timer is not None:
+        cleanup_timer.cancel()
     io.set_pwm(0)
     water_scheduler.stop()
     io.cleanup()
@@ -233,6 +284,7 @@ def main():
     web_thread = threading.Thread(target=run_web_server, daemon=True)
     web_thread.start()
     water_scheduler.start()
+    schedule_cleanup()
 
     print("=" * 50)
     print("  Chamber Controller Started")
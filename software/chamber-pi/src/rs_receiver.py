@@ -10,7 +10,9 @@ Packet format (single newline-terminated line sent by rs_transciever.c):
   START sample_count:N,f1:N,f2:N,fz:N,f3:N,f4:N,f5:N,fy:N,f6:N,fxl:N,f7:N,f8:N,nir:N,clear:N,gps_valid:N,lat:F,lon:F,time:N END
 """
 
+import os
 import re
+import select
 import subprocess
 import serial
 import RPi.GPIO as GPIO
@@ -25,8 +27,31 @@ _INT_FIELDS = {
 _FLOAT_FIELDS = {'lat', 'lon'}
 _ALL_FIELDS = _INT_FIELDS | _FLOAT_FIELDS
 
+# PL011 device behind /dev/serial0; its permissions are reset on every hangup
+_TTY_DEVICE = '/dev/ttyAMA0'
+
 # Matches START...END on a single line; no \n required (handles hangup before \n arrives)
 _PACKET_RE = re.compile(rb'START\s+([^\r\n]+)\s+END')
+_LINE_RE = re.compile(r'^START\s+(.+?)\s+END$')
+
+
+def _parse_int(val: bytes) -> int:
+    """Parse an integer field; only fall back to float() if it carries a decimal point."""
+    try:
+        return int(val)
+    except ValueError:
+        if b'.' not in val:
+            raise
+        return int(float(val))
+
+
+# Field name (as sent on the wire) -> (dict key, parser). int() and float()
+# accept bytes with surrounding whitespace, so fields are parsed in place
+# without decoding the frame.
+_FIELD_PARSERS = {
+    **{name.encode(): (name, _parse_int) for name in _INT_FIELDS},
+    **{name.encode(): (name, float) for name in _FLOAT_FIELDS},
+}
 
 
 def _parse_line(line: str) -> dict | None:
@@ -35,22 +60,25 @@ def _parse_line(line: str) -> dict | None:
     Returns the same structure as lora_receiver.decode_packet, or None on error.
     """
     line = line.strip()
-    m = re.match(r'^START\s+(.+?)\s+END$', line)
+    m = _LINE_RE.match(line)
     if not m:
         return None
+    return _parse_body(m.group(1).encode('ascii', errors='replace'))
 
+
+def _parse_body(body: bytes) -> dict | None:
+    """Parse the comma-separated key:value fields between START and END."""
     fields: dict = {}
-    for pair in m.group(1).split(','):
-        if ':' not in pair:
+    for pair in body.split(b','):
+        key, sep, val = pair.partition(b':')
+        if not sep:
             return None
-        key, _, val = pair.partition(':')
-        key = key.strip()
-        val = val.strip()
+        entry = _FIELD_PARSERS.get(key.strip())
+        if entry is None:
+            continue
+        name, parse = entry
         try:
-            if key in _FLOAT_FIELDS:
-                fields[key] = float(val)
-            elif key in _INT_FIELDS:
-                fields[key] = int(val)
+            fields[name] = parse(val)
         except ValueError:
             return None
 
@@ -88,7 +116,9 @@ class RS485Receiver:
 
     def __init__(self):
         self._ser = None
+        self._fd = None
         self._buf = b''
+        self._rescan = False  # buffer may still hold a frame after the last match
         self.status = 'Not initialized'
         self.hardware_ready = False
 
@@ -116,17 +146,21 @@ class RS485Receiver:
             except Exception:
                 pass
             self._ser = None
+            self._fd = None
 
         # A udev 'change' event fires on every serial hangup and resets
         # /dev/ttyAMA0 to 0600 root:tty.  Restore permissions before opening.
         # (sudoers entry installed by setup.sh grants this without a password)
-        try:
-            subprocess.run(
-                ['sudo', 'chmod', '660', '/dev/ttyAMA0'],
-                capture_output=True, timeout=2,
-            )
-        except Exception:
-            pass
+        # The port is reopened after every packet, so only spawn sudo when the
+        # udev rule hasn't already left the device accessible.
+        if not os.access(_TTY_DEVICE, os.R_OK | os.W_OK):
+            try:
+                subprocess.run(
+                    ['sudo', 'chmod', '660', _TTY_DEVICE],
+                    capture_output=True, timeout=2,
+                )
+            except Exception:
+                pass
 
         try:
             self._ser = serial.Serial(
@@ -136,6 +170,7 @@ class RS485Receiver:
                 dsrdtr=False,
                 rtscts=False,
             )
+            self._fd = self._ser.fileno()
             print(f'[RS485] Port opened: {RS_UART_DEVICE} @ {RS_RX_BAUD}')
         except Exception as exc:
             self._ser = None
@@ -147,6 +182,21 @@ class RS485Receiver:
             return False
         return GPIO.input(RJ45_SNS_PIN) == GPIO.LOW
 
+    def discard_input(self):
+        """Drop any bytes buffered in the kernel and in the frame buffer.
+
+        poll() is not called while the link is on LoRa, so anything received
+        in the meantime is out of date by the time the cable is detected.
+        """
+        self._buf = b''
+        self._rescan = False
+        if self._ser is None:
+            return
+        try:
+            self._ser.reset_input_buffer()
+        except Exception as exc:
+            print(f'[RS485] Failed to flush input buffer: {exc}')
+
     def poll(self) -> dict | None:
         """Read available bytes from the UART, buffer them, and return a decoded
         packet dict if a complete START...END frame is available.
@@ -158,10 +208,18 @@ class RS485Receiver:
             self._open_port()
             return None
 
+        # Zero-timeout poll on the fd: most ticks have no new bytes, so skip the
+        # pyserial read path and the buffer rescan entirely. A hangup also
+        # reports readable, so it still reaches read() and is handled below.
+        readable, _, _ = select.select([self._fd], [], [], 0)
+        if not readable and not self._rescan:
+            return None
+
         try:
-            chunk = self._ser.read(4096)
-            if chunk:
-                self._buf += chunk
+            if readable:
+                chunk = self._ser.read(4096)
+                if chunk:
+                    self._buf += chunk
         except serial.SerialException:
             # The ESP32 de-asserts RS485 EN and deep-sleeps, causing a UART
             # hangup on the Pi side.  Close and reopen so the port is ready
@@ -177,11 +235,12 @@ class RS485Receiver:
         # Search for a complete START...END frame without requiring \n.
         m = _PACKET_RE.search(self._buf)
         if m:
-            decoded = m.group(0).decode('ascii', errors='replace')
             self._buf = self._buf[m.end():]
-            print(f'[RS485] Parsing line: {decoded!r}')
-            return _parse_line(decoded)
+            self._rescan = True
+            print(f"[RS485] Parsing line: {m.group(0).decode('ascii', errors='replace')!r}")
+            return _parse_body(m.group(1))
 
+        self._rescan = False
         return None
 
     def close(self):
@@ -2,11 +2,15 @@
 Flask web server with REST API and Server-Sent Events for live updates.
 """
 
-import json
+import gzip
+import os
+import struct
 import time
 import threading
-import queue
-from flask import Flask, jsonify, request, Response, render_template_string
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+import orjson
+from flask import Flask, jsonify, request, Response, send_from_directory
 from typing import Generator
 
 from database import db
@@ -75,30 +79,108 @@ water_scheduler = WaterScheduler()
 
 app = Flask(__name__)
 
+SSE_BUFFER_FRAMES = 16
+
+# SSE framing, shared by every stream
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_KEEPALIVE = b": keepalive\n\n"
+
+# The dev server holds one OS thread per open stream; cap them so a pile of
+# dashboards can't exhaust the Pi's memory
+MAX_SSE_CLIENTS = 32
+
+
+class SSESubscriber:
+    """Lossy per-connection mailbox: appends never block, and a slow client
+    just skips the oldest frames once SSE_BUFFER_FRAMES are pending."""
+    __slots__ = ('messages', 'event')
+
+    def __init__(self):
+        self.messages: deque = deque(maxlen=SSE_BUFFER_FRAMES)
+        self.event = threading.Event()
+
+
 # SSE subscribers
-sse_subscribers: list[queue.Queue] = []
+sse_subscribers: set[SSESubscriber] = set()
 sse_lock = threading.Lock()
 
-# Current state cache (updated by main loop)
-current_state = {
-    'raw_lux': 0,
-    'clamped_lux': 0,
-    'pwm_value': 0,
-    'mode': 'lux',
-    'bounds_min': 0,
-    'bounds_max': 0,
-    'sw1': False,
-    'sw2': False,
-    'web_manual_enabled': False,
-    'web_manual_pwm': 0,
-    'sanity_flag': False,
-    'wired_connected': False,
-    'gps': {'valid': False, 'latitude': 0.0, 'longitude': 0.0, 'unix_time': 0},
-    'timestamp': time.time()
-}
+@dataclass(frozen=True, slots=True)
+class State:
+    """Immutable snapshot of the controller state shown on the dashboard."""
+    raw_lux: int = 0
+    clamped_lux: int = 0
+    pwm_value: int = 0
+    mode: str = 'lux'
+    bounds_min: int = 0
+    bounds_max: int = 0
+    sw1: bool = False
+    sw2: bool = False
+    web_manual_enabled: bool = False
+    web_manual_pwm: int = 0
+    sanity_flag: bool = False
+    wired_connected: bool = False
+    gps: dict = field(default_factory=lambda: {
+        'valid': False, 'latitude': 0.0, 'longitude': 0.0, 'unix_time': 0})
+    timestamp: int = field(default_factory=lambda: time.time_ns() // 1_000_000)  # epoch ms
+
+
+# Current state (updated by main loop). Writers build a new State and publish it
+# under state_lock; readers just load the reference, which is atomic.
+_state_snapshot = State()
 state_lock = threading.Lock()
 
 
+def get_current_state() -> dict:
+    """Current state as a plain dict (same fields as /api/status)."""
+    return asdict(_state_snapshot)
+
+
+# Compact SSE wire format. Booleans are packed into one bitfield; the
+# dashboard's fromWire() maps it back to the /api/status field names.
+_FLAG_SW1 = 1
+_FLAG_SW2 = 2
+_FLAG_WEB_MANUAL = 4
+_FLAG_SANITY = 8
+_FLAG_WIRED = 16
+_MODE_CODES = {'auto': 0, 'manual': 1}
+
+
+def _compact_state(state: State) -> dict:
+    gps = state.gps
+    return {
+        'rl': state.raw_lux,
+        'cl': state.clamped_lux,
+        'p': state.pwm_value,
+        'm': _MODE_CODES.get(state.mode, 0),
+        'bn': state.bounds_min,
+        'bx': state.bounds_max,
+        'f': ((_FLAG_SW1 if state.sw1 else 0)
+              | (_FLAG_SW2 if state.sw2 else 0)
+              | (_FLAG_WEB_MANUAL if state.web_manual_enabled else 0)
+              | (_FLAG_SANITY if state.sanity_flag else 0)
+              | (_FLAG_WIRED if state.wired_connected else 0)),
+        'wp': state.web_manual_pwm,
+        'g': [gps['latitude'], gps['longitude'], gps['unix_time']] if gps.get('valid') else None,
+        't': state.timestamp,
+    }
+
+
+# Last accepted field values; unchanged ticks are not re-encoded or re-sent
+# more often than once per _STATE_REBROADCAST_NS
+_STATE_REBROADCAST_NS = 1_000_000_000
+_last_state_tuple = None
+_last_state_time = 0  # time.monotonic_ns()
+
+# Broadcasts are coalesced to at most one per MIN_BROADCAST_INTERVAL_NS (5 Hz,
+# half the control-loop rate) by a single flusher thread; updates that land
+# while it waits out the interval go out together as the latest state
+MIN_BROADCAST_INTERVAL_NS = 200_000_000
+_broadcast_pending = threading.Event()
+_broadcast_thread = None
+_broadcast_lock = threading.Lock()
+
+
 def update_current_state(raw_lux: int, clamped_lux: int, pwm_value: int,
                          mode: str, bounds_min: int, bounds_max: int,
                          sw1: bool, sw2: bool,
@@ -106,115 +188,286 @@ def update_current_state(raw_lux: int, clamped_lux: int, pwm_value: int,
                          wired_connected: bool = False,
                          gps: dict = None):
     """Update current state and notify SSE subscribers."""
+    global _last_state_tuple, _last_state_time, _state_snapshot
+    now = time.monotonic_ns()
+    new_tuple = (raw_lux, clamped_lux, pwm_value, mode, bounds_min, bounds_max,
+                 sw1, sw2, sanity_flag, wired_connected, gps)
+    if new_tuple == _last_state_tuple and now - _last_state_time < _STATE_REBROADCAST_NS:
+        return
+    _last_state_tuple = new_tuple
+    _last_state_time = now
+
     with state_lock:
-        # Update in-place to preserve references
-        current_state['raw_lux'] = raw_lux
-        current_state['clamped_lux'] = clamped_lux
-        current_state['pwm_value'] = pwm_value
-        current_state['mode'] = mode
-        current_state['bounds_min'] = bounds_min
-        current_state['bounds_max'] = bounds_max
-        current_state['sw1'] = sw1
-        current_state['sw2'] = sw2
-        current_state['sanity_flag'] = sanity_flag
-        current_state['wired_connected'] = wired_connected
-        if gps is not None:
-            current_state['gps'] = gps
-        current_state['timestamp'] = time.time()
-        state_copy = current_state.copy()
-
-    # Notify SSE subscribers
-    broadcast_sse(state_copy)
+        prev = _state_snapshot
+        _state_snapshot = replace(
+            prev,
+            raw_lux=raw_lux,
+            clamped_lux=clamped_lux,
+            pwm_value=pwm_value,
+            mode=mode,
+            bounds_min=bounds_min,
+            bounds_max=bounds_max,
+            sw1=sw1,
+            sw2=sw2,
+            sanity_flag=sanity_flag,
+            wired_connected=wired_connected,
+            gps=prev.gps if gps is None else gps,
+            timestamp=_next_stamp(prev),
+        )
+
+    _schedule_broadcast()
+
+
+def _next_stamp(prev: State) -> int:
+    """Epoch-ms timestamp for a new snapshot, strictly after `prev` so it can
+    double as the /api/status ETag."""
+    return max(time.time_ns() // 1_000_000, prev.timestamp + 1)
+
+
+def _schedule_broadcast():
+    """Wake the flusher thread, starting it on first use."""
+    global _broadcast_thread
+    if _broadcast_thread is None:
+        with _broadcast_lock:
+            if _broadcast_thread is None:
+                _broadcast_thread = threading.Thread(target=_broadcast_loop, daemon=True)
+                _broadcast_thread.start()
+    _broadcast_pending.set()
+
+
+def _broadcast_loop():
+    """Send the current state whenever an update is pending, then hold off for
+    MIN_BROADCAST_INTERVAL_NS so bursts collapse into one frame."""
+    interval = MIN_BROADCAST_INTERVAL_NS / 1e9
+    while True:
+        _broadcast_pending.wait()
+        # Clear before reading the snapshot so a racing update re-arms it
+        _broadcast_pending.clear()
+        try:
+            _broadcast_current_state()
+        except Exception as exc:
+            print(f"[SSE] Broadcast failed: {exc}")
+        time.sleep(interval)
+
+
+def _broadcast_current_state():
+    broadcast_sse(_compact_state(_state_snapshot))
+
+
+def json_response(obj, status: int = 200) -> Response:
+    """JSON response encoded with orjson (native, returns bytes directly)."""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
 
 
 def broadcast_sse(data: dict):
     """Broadcast data to all SSE subscribers."""
-    message = f"data: {json.dumps(data)}\n\n"
-    dead_queues = []
+    message = _SSE_PREFIX + orjson.dumps(data) + _SSE_SUFFIX
 
+    # Snapshot under the lock and deliver outside it, so a slow subscriber
+    # never holds up the control loop or new connections
     with sse_lock:
-        for q in sse_subscribers:
-            try:
-                q.put_nowait(message)
-            except queue.Full:
-                dead_queues.append(q)
-
-        # Remove dead queues
-        for q in dead_queues:
-            sse_subscribers.remove(q)
+        subscribers = list(sse_subscribers)
 
+    for sub in subscribers:
+        sub.messages.append(message)
+        sub.event.set()
 
-def sse_stream() -> Generator[str, None, None]:
-    """Generator for SSE stream."""
-    q: queue.Queue = queue.Queue(maxsize=100)
 
+def _release_subscriber(sub: SSESubscriber):
     with sse_lock:
-        sse_subscribers.append(q)
+        sse_subscribers.discard(sub)
 
+
+def sse_stream(sub: SSESubscriber) -> Generator[bytes, None, None]:
+    """Generator for SSE stream; `sub` is already registered by api_stream."""
     try:
         # Send initial state
-        with state_lock:
-            yield f"data: {json.dumps(current_state)}\n\n"
+        yield _SSE_PREFIX + orjson.dumps(_compact_state(_state_snapshot)) + _SSE_SUFFIX
 
         while True:
-            try:
-                message = q.get(timeout=30)
-                yield message
-            except queue.Empty:
-                # Send keepalive
-                yield ": keepalive\n\n"
+            if not sub.event.wait(timeout=30):
+                yield _KEEPALIVE
+                continue
+            # Clear before draining so a broadcast racing the drain re-arms it
+            sub.event.clear()
+            # Send everything pending as one write instead of one per frame
+            frames = []
+            while sub.messages:
+                frames.append(sub.messages.popleft())
+            if frames:
+                yield b"".join(frames)
     finally:
-        with sse_lock:
-            if q in sse_subscribers:
-                sse_subscribers.remove(q)
+        _release_subscriber(sub)
 
 
 # ============== API Routes ==============
 
 @app.route('/api/status')
 def api_status():
-    """Get current system status."""
-    with state_lock:
-        return jsonify(current_state)
+    """Get current system status (GETs are normally answered by _fast_paths)."""
+    _, etag, _, body = _status_response()
+    response = Response(body, mimetype='application/json')
+    response.headers['ETag'] = etag
+    return response
+
+
+def _fast_paths(flask_wsgi):
+    """WSGI middleware answering GET /api/status before Flask's request
+    context, routing and response hooks run; the payload is a tiny dump of
+    the snapshot, so that machinery dominated the request."""
+    def wsgi(environ, start_response):
+        if environ.get('PATH_INFO') == '/api/status' and environ.get('REQUEST_METHOD') == 'GET':
+            _, etag, headers, body = _status_response()
+            if environ.get('HTTP_IF_NONE_MATCH') == etag:
+                start_response('304 Not Modified', [('ETag', etag)])
+                return []
+            start_response('200 OK', list(headers))
+            return [body]
+        return flask_wsgi(environ, start_response)
+    return wsgi
+
+
+# (snapshot, etag, headers, body) for the last snapshot /api/status served;
+# polls between state changes reuse the encoded bytes
+_status_cache = (None, '', (), b'')
+
+
+def _status_response():
+    global _status_cache
+    cache = _status_cache
+    snapshot = _state_snapshot
+    if cache[0] is not snapshot:
+        body = orjson.dumps(snapshot)
+        # Every published snapshot carries a strictly newer timestamp
+        etag = f'"{snapshot.timestamp}"'
+        headers = (('Content-Type', 'application/json'),
+                   ('Content-Length', str(len(body))),
+                   ('ETag', etag))
+        cache = _status_cache = (snapshot, etag, headers, body)
+    return cache
+
+
+app.wsgi_app = _fast_paths(app.wsgi_app)
+
+
+def parse_control_request(body: bytes) -> tuple[bool, int]:
+    """Decode and validate a /api/control POST body in one pass.
+
+    Returns (enabled, pwm) with pwm clamped to 0..MAX_PWM_VALUE; raises
+    ValueError on malformed input so the route can answer 400, not 500.
+    """
+    try:
+        data = orjson.loads(body) if body else {}
+    except orjson.JSONDecodeError:
+        raise ValueError('body must be valid JSON')
+    if not isinstance(data, dict):
+        raise ValueError('body must be a JSON object')
+
+    enabled = data.get('enabled', False)
+    pwm = data.get('pwm', 0)
+    if not isinstance(enabled, bool):
+        raise ValueError('enabled must be true or false')
+    if isinstance(pwm, bool) or not isinstance(pwm, (int, float)):
+        raise ValueError('pwm must be a number')
+    return enabled, max(0, min(MAX_PWM_VALUE, int(pwm)))
 
 
 @app.route('/api/control', methods=['GET', 'POST'])
 def api_control():
     """Get or set web manual control state."""
+    global _state_snapshot
     if request.method == 'GET':
         state = db.get_web_control_state()
         return jsonify(state)
 
     # POST - update control state
-    data = request.get_json() or {}
-
-    enabled = data.get('enabled', False)
-    pwm = data.get('pwm', 0)
-
-    # Validate PWM value
-    pwm = max(0, min(MAX_PWM_VALUE, int(pwm)))
+    try:
+        enabled, pwm = parse_control_request(request.get_data())
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
 
     db.set_web_control_state(enabled, pwm)
 
     # Update current state cache
     with state_lock:
-        current_state['web_manual_enabled'] = enabled
-        current_state['web_manual_pwm'] = pwm
+        _state_snapshot = replace(_state_snapshot, web_manual_enabled=enabled,
+                                  web_manual_pwm=pwm,
+                                  timestamp=_next_stamp(_state_snapshot))
 
     return jsonify({'success': True, 'enabled': enabled, 'pwm': pwm})
 
 
+# Binary history record: little-endian float64 timestamp (s), uint32 raw lux,
+# uint32 clamped lux, uint16 PWM -- 18 bytes against ~150 as JSON
+HISTORY_ROW = struct.Struct('<dIIH')
+_U32_MAX = 0xFFFFFFFF
+_U16_MAX = 0xFFFF
+
+
+def _saturate(value, hi: int) -> int:
+    """Clamp a stored value into an unsigned HISTORY_ROW field. A garbled
+    reading must not raise struct.error mid-stream, after the 200 is sent."""
+    value = int(value)
+    return 0 if value < 0 else hi if value > hi else value
+
+
 @app.route('/api/history')
 def api_history():
-    """Get historical data."""
+    """Get historical data.
+
+    With ?since=<timestamp> only rows newer than the cursor are returned, as
+    {"rows": [...], "next_cursor": <timestamp>}; otherwise the newest `limit`
+    rows of the last `hours` as a plain list, or with ?format=bin as packed
+    HISTORY_ROW records (see decodeHistory in the dashboard).
+    """
     # Query parameters
     hours = request.args.get('hours', 24, type=float)
     limit = request.args.get('limit', 1000, type=int)
-
-    start_time = time.time() - (hours * 3600)
-    history = db.get_history(start_time=start_time, limit=limit)
-
-    return jsonify(history)
+    since = request.args.get('since', type=float)
+    fmt = request.args.get('format', 'json')
+
+    # Cheap version check first: a poll that finds no new rows costs two
+    # index lookups and a 304, with no rows fetched or encoded
+    if since is not None:
+        etag = f"{db.get_history_version()}-since{since!r}-{limit}"
+    else:
+        start_time = time.time() - (hours * 3600)
+        etag = f"{db.get_history_version(start_time, limit)}-{limit}-{fmt}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    if since is not None:
+        rows = db.get_history_since(since, limit=limit)
+        next_cursor = rows[-1]['timestamp'] if rows else since
+        response = json_response({'rows': rows, 'next_cursor': next_cursor})
+    elif fmt == 'bin':
+        def stream_bin() -> Generator[bytes, None, None]:
+            size = HISTORY_ROW.size
+            for chunk in db.iter_history(start_time=start_time, limit=limit):
+                buf = bytearray(size * len(chunk))
+                for i, row in enumerate(chunk):
+                    HISTORY_ROW.pack_into(buf, i * size, row['timestamp'],
+                                          _saturate(row['raw_lux'], _U32_MAX),
+                                          _saturate(row['clamped_lux'], _U32_MAX),
+                                          _saturate(row['pwm_value'], _U16_MAX))
+                yield bytes(buf)
+
+        response = Response(stream_bin(), mimetype='application/octet-stream')
+    else:
+        def stream() -> Generator[bytes, None, None]:
+            # Encode chunk by chunk so the full list never sits in memory
+            sep = b'['
+            for chunk in db.iter_history(start_time=start_time, limit=limit):
+                yield sep + b','.join(map(orjson.dumps, chunk))
+                sep = b','
+            yield b']' if sep == b',' else b'[]'
+
+        response = Response(stream(), mimetype='application/json')
+
+    response.set_etag(etag)
+    return response
 
 
 @app.route('/api/stats')
@@ -222,14 +475,23 @@ def api_stats():
     """Get statistics."""
     hours = request.args.get('hours', 24, type=int)
     stats = db.get_stats(hours)
-    return jsonify(stats)
+    return json_response(stats)
 
 
 @app.route('/api/stream')
 def api_stream():
     """Server-Sent Events stream for live updates."""
-    return Response(
-        sse_stream(),
+    # Reserve the slot under the same lock as the capacity check, so concurrent
+    # connects can't all pass the check before any of them registers
+    sub = SSESubscriber()
+    with sse_lock:
+        full = len(sse_subscribers) >= MAX_SSE_CLIENTS
+        if not full:
+            sse_subscribers.add(sub)
+    if full:
+        return json_response({'error': 'too many live clients'}, 503)
+    response = Response(
+        sse_stream(sub),
         mimetype='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
@@ -237,6 +499,10 @@ def api_stream():
             'X-Accel-Buffering': 'no'
         }
     )
+    # The generator's finally only runs once iteration has started; also
+    # release on close in case the client drops before the first frame
+    response.call_on_close(lambda: _release_subscriber(sub))
+    return response
 
 
 @app.route('/api/usb')
@@ -275,953 +541,39 @@ def api_spectrum():
     return jsonify(db.get_spectral_history(hours=hours, limit=limit))
 
 
+# Dashboard page lives in static/dashboard.html. The plain copy is sent from
+# disk (sendfile); a gzipped copy is built once at import for clients that
+# accept it. Both honour If-None-Match / If-Modified-Since.
+_DASHBOARD_FILE = 'dashboard.html'
+with open(os.path.join(app.static_folder, _DASHBOARD_FILE), 'rb') as _f:
+    _DASHBOARD_GZ = gzip.compress(_f.read(), 9)
+_DASHBOARD_MTIME = os.path.getmtime(os.path.join(app.static_folder, _DASHBOARD_FILE))
+
+
 @app.route('/')
 def index():
     """Serve the main dashboard."""
-    return render_template_string(DASHBOARD_HTML)
-
-
-# ============== Dashboard HTML ==============
-
-DASHBOARD_HTML = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Chamber Control</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        :root {
-            --bg-primary: #0f0f0f;
-            --bg-secondary: #1a1a1a;
-            --bg-card: #242424;
-            --text-primary: #ffffff;
-            --text-secondary: #a0a0a0;
-            --accent: #3b82f6;
-            --accent-hover: #2563eb;
-            --success: #22c55e;
-            --warning: #f59e0b;
-            --danger: #ef4444;
-            --border: #333333;
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-            background: var(--bg-primary);
-            color: var(--text-primary);
-            min-height: 100vh;
-            line-height: 1.5;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 24px;
-        }
-
-        header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 32px;
-            padding-bottom: 24px;
-            border-bottom: 1px solid var(--border);
-        }
-
-        .logo {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }
-
-        .logo-icon {
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--accent), #8b5cf6);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-
-        .logo-icon svg {
-            width: 24px;
-            height: 24px;
-            fill: white;
-        }
-
-        h1 {
-            font-size: 24px;
-            font-weight: 600;
-        }
-
-        .status-badge {
-            display: flex;
-            align-items: center;
-            gap: 8px;
-            padding: 8px 16px;
-            background: var(--bg-card);
-            border-radius: 20px;
-            font-size: 14px;
-        }
-
-        .status-dot {
-            width: 8px;
-            height: 8px;
-            border-radius: 50%;
-            background: var(--success);
-            animation: pulse 2s infinite;
-        }
-
-        .status-dot.disconnected {
-            background: var(--danger);
-            animation: none;
-        }
-
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.5; }
-        }
-
-        .grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-            gap: 24px;
-            margin-bottom: 24px;
-        }
-
-        .card {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 24px;
-            border: 1px solid var(--border);
-        }
-
-        .card-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 20px;
-        }
-
-        .card-title {
-            font-size: 14px;
-            font-weight: 500;
-            color: var(--text-secondary);
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }
-
-        .card-icon {
-            width: 36px;
-            height: 36px;
-            background: var(--bg-secondary);
-            border-radius: 8px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-
-        .card-icon svg {
-            width: 20px;
-            height: 20px;
-            fill: var(--accent);
-        }
-
-        .metric {
-            display: flex;
-            flex-direction: column;
-            gap: 4px;
-        }
-
-        .metric-value {
-            font-size: 48px;
-            font-weight: 700;
-            line-height: 1;
-        }
-
-        .metric-unit {
-            font-size: 16px;
-            color: var(--text-secondary);
-        }
-
-        .metric-label {
-            font-size: 14px;
-            color: var(--text-secondary);
-        }
-
-        .metric-row {
-            display: flex;
-            justify-content: space-between;
-            padding: 12px 0;
-            border-bottom: 1px solid var(--border);
-        }
-
-        .metric-row:last-child {
-            border-bottom: none;
-        }
-
-        .control-section {
-            margin-top: 20px;
-        }
-
-        .toggle-container {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            padding: 16px;
-            background: var(--bg-secondary);
-            border-radius: 12px;
-            margin-bottom: 16px;
-        }
-
-        .toggle-label {
-            font-weight: 500;
-        }
-
-        .toggle {
-            position: relative;
-            width: 56px;
-            height: 28px;
-        }
-
-        .toggle input {
-            opacity: 0;
-            width: 0;
-            height: 0;
-        }
-
-        .toggle-slider {
-            position: absolute;
-            cursor: pointer;
-            inset: 0;
-            background: var(--bg-card);
-            border-radius: 14px;
-            transition: 0.3s;
-        }
-
-        .toggle-slider:before {
-            position: absolute;
-            content: "";
-            height: 22px;
-            width: 22px;
-            left: 3px;
-            bottom: 3px;
-            background: white;
-            border-radius: 50%;
-            transition: 0.3s;
-        }
-
-        .toggle input:checked + .toggle-slider {
-            background: var(--accent);
-        }
-
-        .toggle input:checked + .toggle-slider:before {
-            transform: translateX(28px);
-        }
-
-        .slider-container {
-            padding: 16px;
-            background: var(--bg-secondary);
-            border-radius: 12px;
-        }
-
-        .slider-header {
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 12px;
-        }
-
-        .slider-value {
-            font-weight: 600;
-            color: var(--accent);
-        }
-
-        input[type="range"] {
-            width: 100%;
-            height: 8px;
-            background: var(--bg-card);
-            border-radius: 4px;
-            outline: none;
-            -webkit-appearance: none;
-        }
-
-        input[type="range"]::-webkit-slider-thumb {
-            -webkit-appearance: none;
-            width: 24px;
-            height: 24px;
-            background: var(--accent);
-            border-radius: 50%;
-            cursor: pointer;
-            box-shadow: 0 2px 8px rgba(59, 130, 246, 0.4);
-        }
-
-        input[type="range"]:disabled {
-            opacity: 0.5;
-        }
-
-        input[type="range"]:disabled::-webkit-slider-thumb {
-            cursor: not-allowed;
-            background: var(--text-secondary);
-        }
-
-        .chart-container {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 24px;
-            border: 1px solid var(--border);
-        }
-
-        .chart-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 20px;
-        }
-
-        .chart-title {
-            font-size: 18px;
-            font-weight: 600;
-        }
-
-        .time-selector {
-            display: flex;
-            gap: 8px;
-        }
-
-        .time-btn {
-            padding: 8px 16px;
-            background: var(--bg-secondary);
-            border: none;
-            border-radius: 8px;
-            color: var(--text-secondary);
-            cursor: pointer;
-            font-size: 14px;
-            transition: all 0.2s;
-        }
-
-        .time-btn:hover {
-            background: var(--border);
-        }
-
-        .time-btn.active {
-            background: var(--accent);
-            color: white;
-        }
-
-        .chart-wrapper {
-            position: relative;
-            height: 300px;
-        }
-
-        .bounds-indicator {
-            display: flex;
-            gap: 24px;
-            margin-top: 16px;
-            padding-top: 16px;
-            border-top: 1px solid var(--border);
-        }
-
-        .bound-item {
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }
-
-        .bound-color {
-            width: 12px;
-            height: 12px;
-            border-radius: 3px;
-        }
-
-        .bound-color.min {
-            background: var(--success);
-        }
-
-        .bound-color.max {
-            background: var(--danger);
-        }
-
-        .mode-indicator {
-            display: inline-flex;
-            align-items: center;
-            gap: 6px;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 12px;
-            font-weight: 500;
-            text-transform: uppercase;
-        }
-
-        .mode-indicator.lux {
-            background: rgba(34, 197, 94, 0.2);
-            color: var(--success);
-        }
-
-
-        .mode-indicator.manual {
-            background: rgba(59, 130, 246, 0.2);
-            color: var(--accent);
-        }
-
-        footer {
-            text-align: center;
-            padding: 24px;
-            color: var(--text-secondary);
-            font-size: 14px;
-        }
-
-        @media (max-width: 768px) {
-            .container {
-                padding: 16px;
-            }
-
-            header {
-                flex-direction: column;
-                gap: 16px;
-                align-items: flex-start;
-            }
-
-            .metric-value {
-                font-size: 36px;
-            }
-
-            .grid {
-                grid-template-columns: 1fr;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <div class="logo">
-                <div class="logo-icon">
-                    <svg viewBox="0 0 24 24"><path d="M12 2C6.48 2 2 6.48 2 12s4.48 10 10 10 10-4.48 10-10S17.52 2 12 2zm-2 15l-5-5 1.41-1.41L10 14.17l7.59-7.59L19 8l-9 9z"/></svg>
-                </div>
-                <h1>Chamber Control</h1>
-            </div>
-            <div style="display:flex; align-items:center; gap:12px;">
-                <div class="status-badge" id="dataLinkBadge" style="display:none;">
-                    <span id="dataLinkStatus">--</span>
-                </div>
-                <div class="status-badge">
-                    <div class="status-dot" id="connectionStatus"></div>
-                    <span id="connectionText">Connecting...</span>
-                </div>
-            </div>
-        </header>
-
-        <div class="grid">
-            <!-- Live Lux Card -->
-            <div class="card">
-                <div class="card-header">
-                    <span class="card-title">Live Light Intensity</span>
-                    <div class="card-icon">
-                        <svg viewBox="0 0 24 24"><path d="M12 7c-2.76 0-5 2.24-5 5s2.24 5 5 5 5-2.24 5-5-2.24-5-5-5zM2 13h2c.55 0 1-.45 1-1s-.45-1-1-1H2c-.55 0-1 .45-1 1s.45 1 1 1zm18 0h2c.55 0 1-.45 1-1s-.45-1-1-1h-2c-.55 0-1 .45-1 1s.45 1 1 1zM11 2v2c0 .55.45 1 1 1s1-.45 1-1V2c0-.55-.45-1-1-1s-1 .45-1 1zm0 18v2c0 .55.45 1 1 1s1-.45 1-1v-2c0-.55-.45-1-1-1s-1 .45-1 1z"/></svg>
-                    </div>
-                </div>
-                <div class="metric">
-                    <div>
-                        <span class="metric-value" id="luxValue">--</span>
-                        <span class="metric-unit">lux</span>
-                    </div>
-                    <span class="metric-label">Clamped: <span id="clampedValue">--</span> lux</span>
-                </div>
-                <div class="bounds-indicator">
-                    <div class="bound-item">
-                        <div class="bound-color min"></div>
-                        <span>Min: <span id="boundsMin">--</span></span>
-                    </div>
-                    <div class="bound-item">
-                        <div class="bound-color max"></div>
-                        <span>Max: <span id="boundsMax">--</span></span>
-                    </div>
-                </div>
-            </div>
-
-            <!-- PWM Output Card -->
-            <div class="card">
-                <div class="card-header">
-                    <span class="card-title">LED Output</span>
-                    <div class="card-icon">
-                        <svg viewBox="0 0 24 24"><path d="M9 21c0 .55.45 1 1 1h4c.55 0 1-.45 1-1v-1H9v1zm3-19C8.14 2 5 5.14 5 9c0 2.38 1.19 4.47 3 5.74V17c0 .55.45 1 1 1h6c.55 0 1-.45 1-1v-2.26c1.81-1.27 3-3.36 3-5.74 0-3.86-3.14-7-7-7z"/></svg>
-                    </div>
-                </div>
-                <div class="metric">
-                    <div>
-                        <span class="metric-value" id="pwmValue">--</span>
-                        <span class="metric-unit">/ 1023</span>
-                    </div>
-                    <span class="metric-label"><span id="pwmPercent">--</span>% brightness</span>
-                </div>
-                <div style="margin-top: 16px">
-                    <span class="mode-indicator" id="modeIndicator">--</span>
-                </div>
-            </div>
-
-            <!-- Manual Control Card -->
-            <div class="card">
-                <div class="card-header">
-                    <span class="card-title">Web Manual Control</span>
-                    <div class="card-icon">
-                        <svg viewBox="0 0 24 24"><path d="M7 24h2v-2H7v2zm4 0h2v-2h-2v2zm4 0h2v-2h-2v2zM16 .01L8 0C6.9 0 6 .9 6 2v16c0 1.1.9 2 2 2h8c1.1 0 2-.9 2-2V2c0-1.1-.9-1.99-2-1.99zM16 16H8V4h8v12z"/></svg>
-                    </div>
-                </div>
-                <div class="control-section">
-                    <div class="toggle-container">
-                        <span class="toggle-label">Enable Web Control</span>
-                        <label class="toggle">
-                            <input type="checkbox" id="webManualToggle" onchange="toggleWebManual()">
-                            <span class="toggle-slider"></span>
-                        </label>
-                    </div>
-                    <div class="slider-container">
-                        <div class="slider-header">
-                            <span>Manual Brightness</span>
-                            <span class="slider-value" id="manualPwmDisplay">0</span>
-                        </div>
-                        <input type="range" id="manualPwmSlider" min="0" max="1023" value="0"
-                               oninput="updateManualPwm()" disabled>
-                    </div>
-                </div>
-            </div>
-
-            <!-- GPS / Satellite Card -->
-            <div class="card">
-                <div class="card-header">
-                    <span class="card-title">GPS / Satellite</span>
-                    <div class="card-icon">
-                        <svg viewBox="0 0 24 24"><path d="M12 2C8.13 2 5 5.13 5 9c0 5.25 7 13 7 13s7-7.75 7-13c0-3.87-3.13-7-7-7zm0 9.5c-1.38 0-2.5-1.12-2.5-2.5s1.12-2.5 2.5-2.5 2.5 1.12 2.5 2.5-1.12 2.5-2.5 2.5z"/></svg>
-                    </div>
-                </div>
-                <div class="metric-row">
-                    <span>Fix</span>
-                    <span id="gpsFixStatus" class="mode-indicator" style="font-size:11px;">--</span>
-                </div>
-                <div class="metric-row">
-                    <span>Latitude</span>
-                    <span id="gpsLat">--</span>
-                </div>
-                <div class="metric-row">
-                    <span>Longitude</span>
-                    <span id="gpsLon">--</span>
-                </div>
-                <div class="metric-row">
-                    <span>UTC Time</span>
-                    <span id="gpsTime">--</span>
-                </div>
-            </div>
-        </div>
-
-        <!-- Chart Section -->
-        <div class="chart-container">
-            <div class="chart-header">
-                <span class="chart-title">Light Intensity History</span>
-                <div style="display:flex; align-items:center; gap:12px;">
-                    <select id="channelSelect" onchange="onChannelChange()"
-                        style="padding:6px 10px; background:var(--bg-secondary); border:1px solid var(--border); border-radius:8px; color:var(--text-primary); font-size:13px; cursor:pointer;">
-                        <option value="clear" selected>Clear (default)</option>
-                        <option value="f1">F1 ~405nm</option>
-                        <option value="f2">F2 ~425nm</option>
-                        <option value="fz">FZ ~450nm</option>
-                        <option value="f3">F3 ~475nm</option>
-                        <option value="f4">F4 ~515nm</option>
-                        <option value="f5">F5 ~555nm</option>
-                        <option value="fy">FY ~590nm</option>
-                        <option value="f6">F6 ~630nm</option>
-                        <option value="fxl">FXL ~680nm</option>
-                        <option value="f7">F7 ~710nm</option>
-                        <option value="f8">F8 ~760nm</option>
-                        <option value="nir">NIR ~860nm</option>
-                    </select>
-                    <div class="time-selector">
-                        <button class="time-btn" onclick="loadHistory(1)">1H</button>
-                        <button class="time-btn active" onclick="loadHistory(6)">6H</button>
-                        <button class="time-btn" onclick="loadHistory(24)">24H</button>
-                        <button class="time-btn" onclick="loadHistory(168)">7D</button>
-                    </div>
-                </div>
-            </div>
-            <div id="sanityWarning" style="display:none; margin-bottom:12px; padding:10px 16px; background:rgba(245,158,11,0.15); border:1px solid rgba(245,158,11,0.4); border-radius:8px; color:var(--warning); font-size:13px;">
-                &#9888; Sanity flag: received light reading is significantly outside the expected solar range for current GPS position and time.
-            </div>
-            <div class="chart-wrapper">
-                <canvas id="luxChart"></canvas>
-            </div>
-        </div>
-
-        <!-- Water Control Section -->
-        <div class="chart-container" style="margin-bottom: 24px;">
-            <div class="chart-header">
-                <span class="chart-title">Water System</span>
-                <span id="valveStatusBadge" style="padding:4px 12px; border-radius:20px; font-size:12px; font-weight:600; background:rgba(239,68,68,0.2); color:#ef4444;">CLOSED</span>
-            </div>
-
-            <div class="toggle-container" style="margin-bottom:16px;">
-                <span class="toggle-label">Auto Schedule</span>
-                <label class="toggle">
-                    <input type="checkbox" id="waterModeToggle" onchange="setWaterMode()">
-                    <span class="toggle-slider"></span>
-                </label>
-            </div>
-
-            <div id="waterManualSection" class="slider-container" style="margin-bottom:16px;">
-                <div class="slider-header"><span>Manual Valve</span></div>
-                <div style="display:flex; gap:12px; margin-top:8px;">
-                    <button onclick="setManualValve(true)" style="flex:1; padding:12px; background:var(--success); border:none; border-radius:8px; color:white; font-weight:600; cursor:pointer;">OPEN</button>
-                    <button onclick="setManualValve(false)" style="flex:1; padding:12px; background:var(--danger); border:none; border-radius:8px; color:white; font-weight:600; cursor:pointer;">CLOSE</button>
-                </div>
-            </div>
-
-            <div id="waterAutoSection" class="slider-container" style="display:none;">
-                <div style="display:grid; grid-template-columns:1fr 1fr; gap:16px; margin-bottom:16px;">
-                    <div>
-                        <label style="display:block; font-size:13px; color:var(--text-secondary); margin-bottom:6px;">Interval (minutes)</label>
-                        <input type="number" id="waterInterval" min="1" value="120" style="width:100%; padding:10px; background:var(--bg-secondary); border:1px solid var(--border); border-radius:8px; color:white; font-size:16px;">
-                    </div>
-                    <div>
-                        <label style="display:block; font-size:13px; color:var(--text-secondary); margin-bottom:6px;">Duration (seconds)</label>
-                        <input type="number" id="waterDuration" min="1" value="10" style="width:100%; padding:10px; background:var(--bg-secondary); border:1px solid var(--border); border-radius:8px; color:white; font-size:16px;">
-                    </div>
-                </div>
-                <button onclick="saveAutoSchedule()" style="width:100%; padding:12px; background:var(--accent); border:none; border-radius:8px; color:white; font-weight:600; cursor:pointer;">Save Schedule</button>
-            </div>
-        </div>
-
-        <footer>
-            <p>Chamber Control System &bull; Nitrogen Fixation Lab</p>
-        </footer>
-    </div>
-
-    <script>
-        // Chart setup
-        const ctx = document.getElementById('luxChart').getContext('2d');
-        const luxChart = new Chart(ctx, {
-            type: 'line',
-            data: {
-                labels: [],
-                datasets: [
-                    {
-                        label: 'Raw Lux',
-                        data: [],
-                        borderColor: '#3b82f6',
-                        backgroundColor: 'rgba(59, 130, 246, 0.1)',
-                        fill: true,
-                        tension: 0.4,
-                        pointRadius: 0
-                    },
-                    {
-                        label: 'Clamped Lux',
-                        data: [],
-                        borderColor: '#22c55e',
-                        backgroundColor: 'transparent',
-                        borderDash: [5, 5],
-                        tension: 0.4,
-                        pointRadius: 0
-                    }
-                ]
-            },
-            options: {
-                responsive: true,
-                maintainAspectRatio: false,
-                interaction: {
-                    intersect: false,
-                    mode: 'index'
-                },
-                plugins: {
-                    legend: {
-                        position: 'top',
-                        labels: {
-                            color: '#a0a0a0',
-                            usePointStyle: true
-                        }
-                    }
-                },
-                scales: {
-                    x: {
-                        grid: {
-                            color: '#333333'
-                        },
-                        ticks: {
-                            color: '#a0a0a0',
-                            maxTicksLimit: 10
-                        }
-                    },
-                    y: {
-                        grid: {
-                            color: '#333333'
-                        },
-                        ticks: {
-                            color: '#a0a0a0'
-                        },
-                        beginAtZero: true
-                    }
-                }
-            }
-        });
-
-        // SSE Connection
-        let eventSource = null;
-        let reconnectTimeout = null;
-
-        function connectSSE() {
-            if (eventSource) {
-                eventSource.close();
-            }
-
-            eventSource = new EventSource('/api/stream');
-
-            eventSource.onopen = () => {
-                document.getElementById('connectionStatus').classList.remove('disconnected');
-                document.getElementById('connectionText').textContent = 'Connected';
-                if (reconnectTimeout) {
-                    clearTimeout(reconnectTimeout);
-                    reconnectTimeout = null;
-                }
-            };
-
-            eventSource.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                updateUI(data);
-                const now = Date.now();
-                if (now - _lastChartRefresh > 10000) {
-                    _lastChartRefresh = now;
-                    loadHistory(_currentHours);
-                }
-            };
-
-            eventSource.onerror = () => {
-                document.getElementById('connectionStatus').classList.add('disconnected');
-                document.getElementById('connectionText').textContent = 'Disconnected';
-                eventSource.close();
-
-                // Reconnect after 3 seconds
-                reconnectTimeout = setTimeout(connectSSE, 3000);
-            };
-        }
-
-        function updateUI(data) {
-            // Sanity flag
-            document.getElementById('sanityWarning').style.display =
-                data.sanity_flag ? 'block' : 'none';
-
-            // Update lux values
-            document.getElementById('luxValue').textContent = data.raw_lux;
-            document.getElementById('clampedValue').textContent = data.clamped_lux;
-            document.getElementById('boundsMin').textContent = data.bounds_min;
-            document.getElementById('boundsMax').textContent = data.bounds_max;
-
-            // Update PWM
-            document.getElementById('pwmValue').textContent = data.pwm_value;
-            const percent = ((data.pwm_value / 1023) * 100).toFixed(1);
-            document.getElementById('pwmPercent').textContent = percent;
-
-            // Update mode indicator
-            const modeEl = document.getElementById('modeIndicator');
-            if (data.web_manual_enabled) {
-                modeEl.textContent = 'WEB MANUAL';
-                modeEl.className = 'mode-indicator manual';
-            } else {
-                modeEl.textContent = 'AUTO LUX';
-                modeEl.className = 'mode-indicator lux';
-            }
-
-            // Data link badge in header
-            const linkEl = document.getElementById('dataLinkStatus');
-            const linkBadge = document.getElementById('dataLinkBadge');
-            linkBadge.style.display = 'flex';
-            if (data.wired_connected) {
-                linkEl.textContent = 'WIRED';
-                linkBadge.style.background = 'rgba(59,130,246,0.15)';
-                linkBadge.style.color = '#60a5fa';
-                linkBadge.style.border = '1px solid rgba(59,130,246,0.4)';
-            } else {
-                linkEl.textContent = 'WIRELESS';
-                linkBadge.style.background = 'rgba(168,85,247,0.15)';
-                linkBadge.style.color = '#c084fc';
-                linkBadge.style.border = '1px solid rgba(168,85,247,0.4)';
-            }
-
-            // Update GPS
-            const gps = data.gps || {};
-            const fixEl = document.getElementById('gpsFixStatus');
-            if (gps.valid) {
-                fixEl.textContent = 'FIX';
-                fixEl.style.background = 'rgba(34,197,94,0.2)';
-                fixEl.style.color = 'var(--success)';
-                document.getElementById('gpsLat').textContent = gps.latitude.toFixed(6) + '\u00b0';
-                document.getElementById('gpsLon').textContent = gps.longitude.toFixed(6) + '\u00b0';
-                if (gps.unix_time > 0) {
-                    const d = new Date(gps.unix_time * 1000);
-                    document.getElementById('gpsTime').textContent =
-                        d.toUTCString().slice(5, 22);
-                } else {
-                    document.getElementById('gpsTime').textContent = '--';
-                }
-            } else {
-                fixEl.textContent = 'NO FIX';
-                fixEl.style.background = 'rgba(239,68,68,0.2)';
-                fixEl.style.color = 'var(--danger)';
-                document.getElementById('gpsLat').textContent = '--';
-                document.getElementById('gpsLon').textContent = '--';
-                document.getElementById('gpsTime').textContent = '--';
-            }
-
-            // Update web control state
-            document.getElementById('webManualToggle').checked = data.web_manual_enabled;
-            document.getElementById('manualPwmSlider').disabled = !data.web_manual_enabled;
-            if (!document.getElementById('manualPwmSlider').matches(':active')) {
-                document.getElementById('manualPwmSlider').value = data.web_manual_pwm;
-                document.getElementById('manualPwmDisplay').textContent = data.web_manual_pwm;
-            }
-        }
-
-        function toggleWebManual() {
-            const enabled = document.getElementById('webManualToggle').checked;
-            const pwm = parseInt(document.getElementById('manualPwmSlider').value);
-
-            document.getElementById('manualPwmSlider').disabled = !enabled;
-
-            fetch('/api/control', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({enabled: enabled, pwm: pwm})
-            });
-        }
-
-        function updateManualPwm() {
-            const pwm = parseInt(document.getElementById('manualPwmSlider').value);
-            document.getElementById('manualPwmDisplay').textContent = pwm;
-
-            const enabled = document.getElementById('webManualToggle').checked;
-            if (enabled) {
-                fetch('/api/control', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({enabled: true, pwm: pwm})
-                });
-            }
-        }
-
-        let _currentHours = 6;
-        let _lastChartRefresh = 0;
-
-        function loadHistory(hours) {
-            _currentHours = hours;
-            // Update active button
-            document.querySelectorAll('.time-btn').forEach(btn => {
-                btn.classList.remove('active');
-                if (btn.textContent === (hours === 168 ? '7D' : hours + 'H')) {
-                    btn.classList.add('active');
-                }
-            });
-
-            const channel = document.getElementById('channelSelect').value;
-
-            if (channel === 'clear') {
-                // Use existing lux_history endpoint
-                fetch(`/api/history?hours=${hours}&limit=500`)
-                    .then(res => res.json())
-                    .then(data => {
-                        const labels = data.map(d => {
-                            const date = new Date(d.timestamp * 1000);
-                            return date.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'});
-                        });
-                        luxChart.data.labels = labels;
-                        luxChart.data.datasets[0].label = 'Raw Lux (clear)';
-                        luxChart.data.datasets[0].data = data.map(d => d.raw_lux);
-                        luxChart.data.datasets[1].label = 'Clamped Lux';
-                        luxChart.data.datasets[1].data = data.map(d => d.clamped_lux);
-                        luxChart.data.datasets[1].hidden = false;
-                        luxChart.update();
-                    });
-            } else {
-                // Use spectral_history endpoint
-                fetch(`/api/spectrum?hours=${hours}&limit=500`)
-                    .then(res => res.json())
-                    .then(data => {
-                        const labels = data.map(d => {
-                            const date = new Date(d.timestamp * 1000);
-                            return date.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'});
-                        });
-                        const channelLabel = document.getElementById('channelSelect').selectedOptions[0].text;
-                        luxChart.data.labels = labels;
-                        luxChart.data.datasets[0].label = channelLabel;
-                        luxChart.data.datasets[0].data = data.map(d => d[channel] ?? 0);
-                        luxChart.data.datasets[1].data = [];
-                        luxChart.data.datasets[1].hidden = true;
-                        luxChart.update();
-                    });
-            }
-        }
-
-        function onChannelChange() { loadHistory(_currentHours); }
-
-        // Initialize
-        connectSSE();
-        loadHistory(6);
-
-        // Refresh history every 30 seconds
-        setInterval(() => loadHistory(_currentHours), 30000);
-
-        // ---- Water System ----
-        function loadWaterState() {
-            fetch('/api/water').then(r => r.json()).then(data => {
-                const isAuto = data.mode === 'auto';
-                document.getElementById('waterModeToggle').checked = isAuto;
-                document.getElementById('waterManualSection').style.display = isAuto ? 'none' : 'block';
-                document.getElementById('waterAutoSection').style.display = isAuto ? 'block' : 'none';
-                document.getElementById('waterInterval').value = Math.round(data.auto_interval_s / 60);
-                document.getElementById('waterDuration').value = data.auto_duration_s;
-                updateValveBadge(data.valve_open);
-            });
-        }
-
-        function updateValveBadge(open) {
-            const badge = document.getElementById('valveStatusBadge');
-            badge.textContent = open ? 'OPEN' : 'CLOSED';
-            badge.style.background = open ? 'rgba(34,197,94,0.2)' : 'rgba(239,68,68,0.2)';
-            badge.style.color = open ? '#22c55e' : '#ef4444';
-        }
-
-        function setWaterMode() {
-            const isAuto = document.getElementById('waterModeToggle').checked;
-            document.getElementById('waterManualSection').style.display = isAuto ? 'none' : 'block';
-            document.getElementById('waterAutoSection').style.display = isAuto ? 'block' : 'none';
-            if (!isAuto) postWater({mode: 'manual', manual_open: false});
-        }
-
-        function setManualValve(open) { postWater({mode: 'manual', manual_open: open}); }
-
-        function saveAutoSchedule() {
-            const intervalMin = parseInt(document.getElementById('waterInterval').value) || 120;
-            const duration = parseInt(document.getElementById('waterDuration').value) || 10;
-            postWater({mode: 'auto', auto_interval_s: intervalMin * 60, auto_duration_s: duration});
-        }
-
-        function postWater(payload) {
-            fetch('/api/water', {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(payload)})
-                .then(() => loadWaterState());
-        }
-
-        loadWaterState();
-        setInterval(loadWaterState, 2000);
-    </script>
-</body>
-</html>
-"""
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(_DASHBOARD_GZ, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f"{_DASHBOARD_MTIME:.0f}-{len(_DASHBOARD_GZ)}-gz")
+        response.last_modified = _DASHBOARD_MTIME
+    else:
+        response = send_from_directory(app.static_folder, _DASHBOARD_FILE,
+                                       conditional=True, max_age=3600)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
 
 
 def run_server(host='0.0.0.0', port=5000, debug=False):
-    """Run the Flask server."""
+    """Run the Flask server.
+
+    Runs in-process on a thread next to the control loop, which feeds it via
+    update_current_state, so it can't move to a separate gunicorn/gevent
+    worker; open streams are bounded by MAX_SSE_CLIENTS instead.
+    """
     app.run(host=host, port=port, debug=debug, threaded=True)
 
 
@@ -4,7 +4,9 @@ These simulate GPIO, SPI, Serial, and I2C interfaces.
 """
 
 import sys
-from unittest.mock import MagicMock
+import types
+from array import array
+from collections import deque
 
 
 class MockGPIO:
@@ -16,8 +18,11 @@ class MockGPIO:
     HIGH = 1
     LOW = 0
 
-    _pin_states = {}
-    _pin_modes = {}
+    # Indexed by BCM pin number (0-53). Unconfigured inputs read HIGH, as
+    # they would with the pull-ups every switch on the board uses.
+    _NUM_PINS = 64
+    _pin_states = array('B', [HIGH]) * _NUM_PINS
+    _pin_modes = array('B', [IN]) * _NUM_PINS
 
     @classmethod
     def setmode(cls, mode):
@@ -28,13 +33,16 @@ class MockGPIO:
         pass
 
     @classmethod
-    def setup(cls, pin, mode, pull_up_down=None):
+    def setup(cls, pin, mode, pull_up_down=None, initial=None):
         cls._pin_modes[pin] = mode
-        cls._pin_states[pin] = cls.HIGH if pull_up_down == cls.PUD_UP else cls.LOW
+        if initial is not None:
+            cls._pin_states[pin] = initial
+        else:
+            cls._pin_states[pin] = cls.HIGH if pull_up_down == cls.PUD_UP else cls.LOW
 
     @classmethod
     def input(cls, pin):
-        return cls._pin_states.get(pin, cls.HIGH)
+        return cls._pin_states[pin]
 
     @classmethod
     def output(cls, pin, state):
@@ -42,8 +50,8 @@ class MockGPIO:
 
     @classmethod
     def cleanup(cls):
-        cls._pin_states.clear()
-        cls._pin_modes.clear()
+        cls._pin_states[:] = array('B', [cls.HIGH]) * cls._NUM_PINS
+        cls._pin_modes[:] = array('B', [cls.IN]) * cls._NUM_PINS
 
     @classmethod
     def set_pin(cls, pin, state):
@@ -72,18 +80,15 @@ class MockSpiDev:
         self.port = None
         self.device = None
         self.max_speed_hz = 0
-        self._adc_value = 512  # Default mid-range
+        self.set_adc_value(512)  # Default mid-range
 
     def open(self, port, device):
         self.port = port
         self.device = device
 
     def xfer2(self, data):
-        # Simulate MCP3008 ADC response
-        # Returns 10-bit value split across bytes
-        high = (self._adc_value >> 8) & 0x03
-        low = self._adc_value & 0xFF
-        return [0, high, low]
+        # Simulate MCP3008 ADC response, built once per set_adc_value
+        return self._response
 
     def close(self):
         pass
@@ -91,6 +96,8 @@ class MockSpiDev:
     def set_adc_value(self, value):
         """Test helper to set ADC value (0-1023)."""
         self._adc_value = max(0, min(1023, value))
+        # 10-bit value split across bytes
+        self._response = [0, (self._adc_value >> 8) & 0x03, self._adc_value & 0xFF]
 
 
 class MockSerial:
@@ -99,7 +106,7 @@ class MockSerial:
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
-        self._buffer = []
+        self._buffer = deque()
         self._is_open = True
 
     @property
@@ -108,9 +115,12 @@ class MockSerial:
 
     def readline(self):
         if self._buffer:
-            return self._buffer.pop(0).encode('utf-8')
+            return self._buffer.popleft().encode('utf-8')
         return b''
 
+    def reset_input_buffer(self):
+        self._buffer.clear()
+
     def close(self):
         self._is_open = False
 
@@ -119,6 +129,21 @@ class MockSerial:
         self._buffer.append(line + '\n')
 
 
+class MockSerialException(IOError):
+    """Mock serial.SerialException."""
+
+
+class MockI2cMsg:
+    """Mock smbus2.i2c_msg."""
+    @staticmethod
+    def write(address, buf):
+        return (address, bytes(buf))
+
+    @staticmethod
+    def read(address, length):
+        return (address, bytes(length))
+
+
 class MockSMBus:
     """Mock smbus2.SMBus module."""
     def __init__(self, bus=1):
@@ -128,6 +153,9 @@ class MockSMBus:
     def write_byte(self, address, data):
         self._data[address] = data
 
+    def i2c_rdwr(self, *msgs):
+        pass
+
     def read_byte(self, address):
         return self._data.get(address, 0)
 
@@ -135,33 +163,44 @@ class MockSMBus:
         pass
 
 
+def _stub_module(name, **attrs):
+    """Build a bare module exposing only `attrs`.
+
+    Any other attribute access raises AttributeError, so src/ reaching for
+    something the mocks don't provide fails loudly instead of silently.
+    """
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+_installed = None
+
+
 def install_mocks():
-    """Install mock modules into sys.modules."""
-    # Create mock modules
-    mock_rpi = MagicMock()
-    mock_rpi.GPIO = MockGPIO
+    """Install mock modules into sys.modules (once per process)."""
+    global _installed
+    if _installed is not None:
+        return _installed
 
-    sys.modules['RPi'] = mock_rpi
+    # Mock RPi.GPIO
+    sys.modules['RPi'] = _stub_module('RPi', GPIO=MockGPIO)
     sys.modules['RPi.GPIO'] = MockGPIO
 
     # Mock spidev
-    mock_spidev = MagicMock()
-    mock_spidev.SpiDev = MockSpiDev
-    sys.modules['spidev'] = mock_spidev
+    sys.modules['spidev'] = _stub_module('spidev', SpiDev=MockSpiDev)
 
     # Mock serial
-    mock_serial_module = MagicMock()
-    mock_serial_module.Serial = MockSerial
-    sys.modules['serial'] = mock_serial_module
+    sys.modules['serial'] = _stub_module(
+        'serial', Serial=MockSerial, SerialException=MockSerialException)
 
     # Mock smbus2
-    mock_smbus = MagicMock()
-    mock_smbus.SMBus = MockSMBus
-    sys.modules['smbus2'] = mock_smbus
+    sys.modules['smbus2'] = _stub_module('smbus2', SMBus=MockSMBus, i2c_msg=MockI2cMsg)
 
-    return {
+    _installed = {
         'GPIO': MockGPIO,
         'SpiDev': MockSpiDev,
         'Serial': MockSerial,
         'SMBus': MockSMBus
-    }
\ No newline at end of file
+    }
+    return _installed
\ No newline at end of file
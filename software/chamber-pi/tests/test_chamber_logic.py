@@ -6,6 +6,7 @@ Tests bounds buffer, clamping, mode switching, etc.
 
 import sys
 import os
+from array import array
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -19,6 +20,24 @@ from config import LUX_BUFFER_SIZE, SCALE_CONSTANT, MAX_PWM_VALUE
 from io_controller import IOController
 
 
+_shared_io = None
+
+
+def fresh_io():
+    """Return the shared IOController with its lux window cleared.
+
+    One controller is built per module and reset between tests instead of
+    allocating a new 600-sample buffer and mock devices every time.
+    """
+    global _shared_io
+    if _shared_io is None:
+        _shared_io = IOController()
+    _shared_io.reset()
+    _shared_io.spi = MockSpiDev()
+    _shared_io.serial = MockSerial()
+    return _shared_io
+
+
 class TestResults:
     def __init__(self):
         self.passed = 0
@@ -51,9 +70,7 @@ def test_buffer_initialization():
     print("\n[Test: Buffer Initialization]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     results.record(
         "Buffer size is correct",
@@ -87,9 +104,7 @@ def test_buffer_filling():
     print("\n[Test: Buffer Filling]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     # Add 10 values
     test_values = [100, 150, 200, 180, 120, 90, 250, 175, 160, 140]
@@ -128,25 +143,15 @@ def test_circular_buffer_wrap():
     print("\n[Test: Circular Buffer Wrap]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
-    # Manually set up a small buffer for testing wrap behavior
+    # Treat the first few slots of the real buffer as a small buffer to test wrap behavior
     small_size = 5
-    io.lux_buffer = [0] * small_size
     io.buffer_index = 0
-    io.buffer_count = 0
 
-    # Override the buffer size check by directly manipulating
-    # We'll test the wrap logic manually
-
-    # Fill buffer completely
-    for i in range(small_size):
-        io.lux_buffer[io.buffer_index] = 100 + i * 10
-        io.buffer_index = (io.buffer_index + 1) % small_size
-        if io.buffer_count < small_size:
-            io.buffer_count += 1
+    # Fill buffer completely (the write after this one wraps to index 0)
+    io.lux_buffer[:small_size] = array('i', [100, 110, 120, 130, 140])
+    io.buffer_count = small_size
 
     results.record(
         "Buffer is full",
@@ -193,9 +198,7 @@ def test_clamping_before_buffer_full():
     print("\n[Test: No Clamping Before Buffer Full]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     # Add some values (buffer won't be full since LUX_BUFFER_SIZE=600)
     io.get_clamped_lux(100)
@@ -225,34 +228,12 @@ def test_clamping_after_buffer_full():
     print("\n[Test: Clamping After Buffer Full]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
-
-    # Simulate a full buffer by setting count to max
-    small_size = 5
-    io.lux_buffer = [100, 110, 120, 130, 140] + [0] * (LUX_BUFFER_SIZE - 5)
-    io.buffer_count = LUX_BUFFER_SIZE  # Pretend buffer is full
-    io.buffer_index = 0
-    io._update_bounds()
-
-    # Now buffer appears full, min=100, max=140 (from first 5)
-    # But _update_bounds looks at buffer_count elements
-    # Since buffer_count = LUX_BUFFER_SIZE, it looks at all 600 elements (mostly 0)
-    # So min would be 0. Let me fix this test differently.
-
-    # Actually, let's test the clamping logic directly
-    io.lux_buffer = [0] * LUX_BUFFER_SIZE
-    io.buffer_index = 0
-    io.buffer_count = 0
+    io = fresh_io()
 
     # Fill with stable values
-    for _ in range(LUX_BUFFER_SIZE):
-        io.lux_buffer[io.buffer_index] = 500
-        io.buffer_index = (io.buffer_index + 1) % LUX_BUFFER_SIZE
-        if io.buffer_count < LUX_BUFFER_SIZE:
-            io.buffer_count += 1
-
+    io.lux_buffer[:] = array('i', [500]) * LUX_BUFFER_SIZE
+    io.buffer_index = 0
+    io.buffer_count = LUX_BUFFER_SIZE
     io._update_bounds()
 
     results.record(
@@ -295,12 +276,10 @@ def test_clamping_low_value():
     print("\n[Test: Clamping Low Value]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     # Fill buffer with stable values
-    io.lux_buffer = [500] * LUX_BUFFER_SIZE
+    io.lux_buffer[:] = array('i', [500]) * LUX_BUFFER_SIZE
     io.buffer_index = 0
     io.buffer_count = LUX_BUFFER_SIZE
     io._update_bounds()
@@ -335,12 +314,11 @@ def test_switch_reading():
     print("\n[Test: Switch Reading]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     # Set up mock GPIO
-    MockGPIO._pin_states = {14: MockGPIO.HIGH, 12: MockGPIO.LOW}
+    MockGPIO.set_pin(14, MockGPIO.HIGH)
+    MockGPIO.set_pin(12, MockGPIO.LOW)
 
     io._read_switches()
 
@@ -357,7 +335,8 @@ def test_switch_reading():
     )
 
     # Toggle switches
-    MockGPIO._pin_states = {14: MockGPIO.LOW, 12: MockGPIO.HIGH}
+    MockGPIO.set_pin(14, MockGPIO.LOW)
+    MockGPIO.set_pin(12, MockGPIO.HIGH)
     io._read_switches()
 
     results.record(
@@ -380,9 +359,7 @@ def test_analog_reading():
     print("\n[Test: Analog Reading]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     # Set ADC to mid-range (512)
     io.spi.set_adc_value(512)
@@ -422,9 +399,7 @@ def test_uart_reading():
     print("\n[Test: UART Reading]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     # Add lux value to serial buffer
     io.serial.add_data("1500")
@@ -505,9 +480,7 @@ def test_to_string():
     print("\n[Test: String Representation]")
     results = TestResults()
 
-    io = IOController()
-    io.spi = MockSpiDev()
-    io.serial = MockSerial()
+    io = fresh_io()
 
     io.sw1 = True
     io.sw2 = False
@@ -537,6 +510,140 @@ def test_to_string():
     return results
 
 
+def test_compute_pwm():
+    """Test mode priority and lux scaling in main.compute_pwm."""
+    print("\n[Test: Compute PWM]")
+    results = TestResults()
+
+    # main opens the shared database on import; keep it off chamber_data.db
+    import database
+    database.DB_PATH = ':memory:'
+    from main import compute_pwm, MODE_AUTO, MODE_MANUAL
+
+    result = compute_pwm(500, True, True, 321)
+    results.record(
+        "Web manual overrides lux",
+        result == (321, MODE_MANUAL),
+        f"Expected (321, {MODE_MANUAL!r}), got {result}"
+    )
+
+    result = compute_pwm(500, False, False, 0)
+    results.record(
+        "Disabled output is off",
+        result == (0, MODE_AUTO),
+        f"Expected (0, {MODE_AUTO!r}), got {result}"
+    )
+
+    result = compute_pwm(SCALE_CONSTANT * 2, True, False, 0)
+    results.record(
+        "Lux above scale constant saturates",
+        result == (MAX_PWM_VALUE, MODE_AUTO),
+        f"Expected ({MAX_PWM_VALUE}, {MODE_AUTO!r}), got {result}"
+    )
+
+    # Integer arithmetic must match the float formula it replaced
+    mismatches = [lux for lux in range(SCALE_CONSTANT + 1)
+                  if compute_pwm(lux, True, False, 0)[0] != int(lux / SCALE_CONSTANT * MAX_PWM_VALUE + 0.5)]
+    results.record(
+        "Matches float rounding across the lux range",
+        not mismatches,
+        f"First mismatches: {mismatches[:5]}"
+    )
+
+    return results
+
+
+def test_lcd_write_line():
+    """Test that LCDDisplay.write_line only sends changed characters."""
+    print("\n[Test: LCD Write Line]")
+    results = TestResults()
+
+    from lcd_display import LCDDisplay
+
+    lcd = LCDDisplay()
+    lcd.begin()
+    sent = []  # one (address, frames) message per I2C transfer
+    lcd.bus.i2c_rdwr = sent.append
+
+    def decode(frames):
+        # Each HD44780 byte is two nibbles of three expander frames
+        return [(frames[i] & 0xF0) | (frames[i + 3] >> 4) for i in range(0, len(frames), 6)]
+
+    lcd.write_line(0, "PWM: 100")
+    results.record(
+        "First write sends the text",
+        len(sent) == 2 and decode(sent[1][1]) == list(b"PWM: 100"),
+        f"Got {len(sent)} transfers"
+    )
+
+    sent.clear()
+    lcd.write_line(0, "PWM: 100")
+    results.record(
+        "Repeated text sends nothing",
+        not sent,
+        f"Got {len(sent)} transfers"
+    )
+
+    # Only column 5 differs: one cursor move plus one character
+    lcd.write_line(0, "PWM: 200")
+    results.record(
+        "Changed text sends only the changed cell",
+        len(sent) == 2 and decode(sent[0][1]) == [0x80 | 5] and decode(sent[1][1]) == [ord('2')],
+        f"Got: {[decode(frames) for _, frames in sent]}"
+    )
+
+    return results
+
+
+def test_rs485_parse():
+    """Test decoding of RS-485 START ... END frame bodies."""
+    print("\n[Test: RS-485 Parse]")
+    results = TestResults()
+
+    from rs_receiver import _parse_body, _parse_line
+
+    body = (b"sample_count:7,f1:1,f2:2,fz:3,f3:4,f4:5,f5:6,fy:7,f6:8,fxl:9,"
+            b"f7:10,f8:11,nir:12,clear:13,gps_valid:1,lat:37.5,lon:-122.25,time:1700000000")
+
+    packet = _parse_body(body)
+    results.record(
+        "Valid frame decodes",
+        packet is not None
+        and packet['sample_count'] == 7
+        and packet['channels']['clear'] == 13
+        and packet['gps'] == {'valid': True, 'latitude': 37.5,
+                              'longitude': -122.25, 'unix_time': 1700000000},
+        f"Got: {packet}"
+    )
+
+    packet = _parse_body(body.replace(b"clear:13", b"clear:13.0"))
+    results.record(
+        "Integer field with a decimal point is accepted",
+        packet is not None and packet['channels']['clear'] == 13,
+        f"Got: {packet}"
+    )
+
+    results.record(
+        "Malformed value is rejected",
+        _parse_body(body.replace(b"f2:2", b"f2:abc")) is None,
+        "Expected None"
+    )
+
+    results.record(
+        "Missing field is rejected",
+        _parse_body(body.replace(b",nir:12", b"")) is None,
+        "Expected None"
+    )
+
+    results.record(
+        "Line parser matches body parser",
+        _parse_line(f"START {body.decode()} END\n") == _parse_body(body),
+        "Line and body results differ"
+    )
+
+    return results
+
+
 def run_all_tests():
     """Run all tests and report results."""
     print("=" * 50)
@@ -556,6 +663,9 @@ def run_all_tests():
     all_results.append(test_uart_reading())
     all_results.append(test_pwm_normalization())
     all_results.append(test_to_string())
+    all_results.append(test_compute_pwm())
+    all_results.append(test_lcd_write_line())
+    all_results.append(test_rs485_parse())
 
     # Summary
     total_passed = sum(r.passed for r in all_results)
@@ -6,9 +6,7 @@ Uses mocks to run without Raspberry Pi hardware.
 
 import sys
 import os
-import json
 import time
-import tempfile
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -17,9 +15,32 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 from mock_hardware import install_mocks
 mocks = install_mocks()
 
-# Now we can import the web server (it imports io_controller which needs mocks)
-from database import Database
-from web_server import app, update_current_state, current_state
+# The shared database is opened when web_server first imports it; point it at
+# memory so a test run never touches the tracked chamber_data.db
+import database
+database.DB_PATH = ':memory:'
+
+# database and web_server (Flask, io_controller) are imported inside the tests
+# that use them, so collecting this module stays cheap
+_client = None
+
+
+def get_client():
+    """Return the test client shared by every endpoint test, built on first use."""
+    global _client
+    if _client is None:
+        from web_server import app
+        app.config['TESTING'] = True
+        _client = app.test_client()
+    return _client
+
+
+# Constant control request bodies, serialized once
+PAYLOAD_ON_750 = b'{"enabled": true, "pwm": 750}'
+PAYLOAD_PWM_HIGH = b'{"enabled": true, "pwm": 5000}'
+PAYLOAD_PWM_NEGATIVE = b'{"enabled": true, "pwm": -100}'
+PAYLOAD_PWM_VALID = b'{"enabled": true, "pwm": 512}'
+PAYLOAD_PWM_MALFORMED = b'{"enabled": true, "pwm": "abc"}'
 
 
 class TestResults:
@@ -41,11 +62,10 @@ def test_database():
     print("\n[Test: Database Operations]")
     results = TestResults()
 
-    # Use temp database
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        db_path = f.name
+    from database import Database
 
-    db = Database(db_path)
+    # Use in-memory database
+    db = Database(':memory:')
 
     # Test logging
     db.log_reading(
@@ -56,6 +76,8 @@ def test_database():
         bounds_min=100,
         bounds_max=1000
     )
+    # Readings are committed by the background writer; wait for this one
+    db.flush_readings()
 
     results.record(
         "Log reading succeeds",
@@ -103,8 +125,92 @@ def test_database():
         f"Got: {stats}"
     )
 
+    # Test batched logging
+    inserted = db.log_readings_batch([(1000, 950, 500, 'lux', 100, 1000)] * 50)
+    history = db.get_history(limit=100)
+    results.record(
+        "Log readings batch",
+        inserted == 50 and len(history) == 51,
+        f"Inserted {inserted}, got {len(history)} records"
+    )
+
     db.close()
-    os.unlink(db_path)
+
+    return results
+
+
+def test_lux_timestamp_migration():
+    """Test the REAL-seconds to INTEGER-milliseconds lux_history migration."""
+    print("\n[Test: Lux Timestamp Migration]")
+    results = TestResults()
+
+    import sqlite3
+    import tempfile
+    from database import Database
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'legacy.db')
+
+        # Seed a database with the original schema
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE lux_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL,
+                raw_lux INTEGER NOT NULL,
+                clamped_lux INTEGER NOT NULL,
+                pwm_value INTEGER NOT NULL,
+                mode TEXT NOT NULL,
+                bounds_min INTEGER,
+                bounds_max INTEGER
+            );
+            CREATE INDEX idx_lux_timestamp ON lux_history(timestamp);
+            INSERT INTO lux_history
+                (timestamp, raw_lux, clamped_lux, pwm_value, mode, bounds_min, bounds_max)
+            VALUES (1700000000.1234, 100, 100, 50, 'lux', 0, 100),
+                   (1700000001.5, 200, 150, 60, 'lux', 0, 150);
+        """)
+        conn.commit()
+        conn.close()
+
+        def stored_rows(db):
+            return [tuple(row) for row in db._write_conn.execute(
+                "SELECT id, timestamp, typeof(timestamp), raw_lux FROM lux_history ORDER BY id")]
+
+        def index_names(db):
+            return {row['name'] for row in db._write_conn.execute("PRAGMA index_list(lux_history)")}
+
+        db = Database(path)
+        migrated = stored_rows(db)
+        results.record(
+            "Timestamps rewritten to integer milliseconds",
+            migrated == [(1, 1700000000123, 'integer', 100), (2, 1700000001500, 'integer', 200)],
+            f"Got: {migrated}"
+        )
+
+        history = db.get_history(limit=10)
+        results.record(
+            "History still reports float seconds",
+            [row['timestamp'] for row in history] == [1700000000.123, 1700000001.5],
+            f"Got: {[row['timestamp'] for row in history]}"
+        )
+
+        indexes = index_names(db)
+        results.record(
+            "Covering index replaces the old timestamp index",
+            'idx_lux_ts_cover' in indexes and 'idx_lux_timestamp' not in indexes,
+            f"Got: {indexes}"
+        )
+        db.close()
+
+        # Opening an already-migrated database must leave it unchanged
+        db = Database(path)
+        results.record(
+            "Migration is idempotent",
+            stored_rows(db) == migrated,
+            f"Got: {stored_rows(db)}"
+        )
+        db.close()
 
     return results
 
@@ -113,10 +219,7 @@ def test_api_endpoints():
     """Test Flask API endpoints."""
     print("\n[Test: API Endpoints]")
     results = TestResults()
-
-    # Create test client
-    app.config['TESTING'] = True
-    client = app.test_client()
+    client = get_client()
 
     # Test status endpoint
     response = client.get('/api/status')
@@ -126,7 +229,7 @@ def test_api_endpoints():
         f"Got status {response.status_code}"
     )
 
-    data = json.loads(response.data)
+    data = response.get_json()
     results.record(
         "Status contains expected fields",
         'raw_lux' in data and 'pwm_value' in data and 'mode' in data,
@@ -143,7 +246,7 @@ def test_api_endpoints():
 
     # Test control POST endpoint
     response = client.post('/api/control',
-                           data=json.dumps({'enabled': True, 'pwm': 750}),
+                           data=PAYLOAD_ON_750,
                            content_type='application/json')
     results.record(
         "POST /api/control returns 200",
@@ -151,7 +254,7 @@ def test_api_endpoints():
         f"Got status {response.status_code}"
     )
 
-    data = json.loads(response.data)
+    data = response.get_json()
     results.record(
         "Control update returns success",
         data.get('success') == True and data.get('pwm') == 750,
@@ -166,6 +269,27 @@ def test_api_endpoints():
         f"Got status {response.status_code}"
     )
 
+    # Out-of-range values are saturated rather than breaking the binary stream.
+    # The garbage row goes into a throwaway database swapped in for the request.
+    import web_server
+    from database import Database
+    scratch_db = Database(':memory:')
+    scratch_db.log_readings_batch([(-5, 70000, 100000, 'lux', 0, 0)])
+    saved_db, web_server.db = web_server.db, scratch_db
+    try:
+        response = client.get('/api/history?hours=1&limit=10&format=bin')
+        data = response.data
+    finally:
+        web_server.db = saved_db
+        scratch_db.close()
+    row_size = web_server.HISTORY_ROW.size
+    rows = list(web_server.HISTORY_ROW.iter_unpack(data)) if len(data) % row_size == 0 else []
+    results.record(
+        "Binary history saturates out-of-range rows",
+        response.status_code == 200 and rows and rows[-1][1:] == (0, 70000, 0xFFFF),
+        f"Got status {response.status_code}, {len(data)} bytes"
+    )
+
     # Test stats endpoint
     response = client.get('/api/stats?hours=24')
     results.record(
@@ -196,6 +320,8 @@ def test_state_updates():
     print("\n[Test: State Updates]")
     results = TestResults()
 
+    from web_server import update_current_state, get_current_state
+
     # Update state
     update_current_state(
         raw_lux=2000,
@@ -214,6 +340,7 @@ def test_state_updates():
         True
     )
 
+    current_state = get_current_state()
     results.record(
         "Current state updated",
         current_state['raw_lux'] == 2000 and current_state['pwm_value'] == 700,
@@ -233,15 +360,13 @@ def test_pwm_validation():
     """Test PWM value validation in control endpoint."""
     print("\n[Test: PWM Validation]")
     results = TestResults()
-
-    app.config['TESTING'] = True
-    client = app.test_client()
+    client = get_client()
 
     # Test PWM clamping - too high
     response = client.post('/api/control',
-                           data=json.dumps({'enabled': True, 'pwm': 5000}),
+                           data=PAYLOAD_PWM_HIGH,
                            content_type='application/json')
-    data = json.loads(response.data)
+    data = response.get_json()
     results.record(
         "PWM > 1023 clamped to 1023",
         data.get('pwm') == 1023,
@@ -250,9 +375,9 @@ def test_pwm_validation():
 
     # Test PWM clamping - negative
     response = client.post('/api/control',
-                           data=json.dumps({'enabled': True, 'pwm': -100}),
+                           data=PAYLOAD_PWM_NEGATIVE,
                            content_type='application/json')
-    data = json.loads(response.data)
+    data = response.get_json()
     results.record(
         "PWM < 0 clamped to 0",
         data.get('pwm') == 0,
@@ -261,15 +386,114 @@ def test_pwm_validation():
 
     # Test valid PWM
     response = client.post('/api/control',
-                           data=json.dumps({'enabled': True, 'pwm': 512}),
+                           data=PAYLOAD_PWM_VALID,
                            content_type='application/json')
-    data = json.loads(response.data)
+    data = response.get_json()
     results.record(
         "Valid PWM passes through",
         data.get('pwm') == 512,
         f"Got: {data.get('pwm')}"
     )
 
+    # Test malformed PWM - rejected, not a server error
+    response = client.post('/api/control',
+                           data=PAYLOAD_PWM_MALFORMED,
+                           content_type='application/json')
+    results.record(
+        "Non-numeric PWM returns 400",
+        response.status_code == 400,
+        f"Got status {response.status_code}"
+    )
+
+    return results
+
+
+def test_history_paging():
+    """Test cursor paging with /api/history?since=."""
+    print("\n[Test: History Paging]")
+    results = TestResults()
+    client = get_client()
+
+    import web_server
+    from database import Database
+    scratch_db = Database(':memory:')
+    for pwm in range(3):
+        scratch_db.log_readings_batch([(500, 500, pwm, 'auto', 0, 1000)])
+        time.sleep(0.005)
+    saved_db, web_server.db = web_server.db, scratch_db
+    try:
+        first = client.get('/api/history?since=0&limit=2').get_json()
+        cursor = first['next_cursor']
+        second = client.get(f'/api/history?since={cursor}&limit=2').get_json()
+        empty = client.get(f"/api/history?since={second['next_cursor']}&limit=2").get_json()
+    finally:
+        web_server.db = saved_db
+        scratch_db.close()
+
+    results.record(
+        "First page is the oldest rows",
+        [row['pwm_value'] for row in first['rows']] == [0, 1]
+        and cursor == first['rows'][-1]['timestamp'],
+        f"Got: {first}"
+    )
+
+    results.record(
+        "Next page only holds rows newer than the cursor",
+        [row['pwm_value'] for row in second['rows']] == [2],
+        f"Got: {second}"
+    )
+
+    results.record(
+        "Empty page keeps the cursor",
+        empty['rows'] == [] and empty['next_cursor'] == second['next_cursor'],
+        f"Got: {empty}"
+    )
+
+    return results
+
+
+def test_history_etag():
+    """Test conditional GETs of /api/history."""
+    print("\n[Test: History ETag]")
+    results = TestResults()
+    client = get_client()
+
+    import web_server
+    from database import Database
+    scratch_db = Database(':memory:')
+    scratch_db.log_readings_batch([(500, 500, 100, 'auto', 0, 1000)])
+    saved_db, web_server.db = web_server.db, scratch_db
+    try:
+        first = client.get('/api/history?hours=1&limit=10')
+        etag = first.headers.get('ETag')
+        unchanged = client.get('/api/history?hours=1&limit=10',
+                               headers={'If-None-Match': etag})
+        time.sleep(0.005)
+        scratch_db.log_readings_batch([(600, 600, 200, 'auto', 0, 1000)])
+        changed = client.get('/api/history?hours=1&limit=10',
+                             headers={'If-None-Match': etag})
+    finally:
+        web_server.db = saved_db
+        scratch_db.close()
+
+    results.record(
+        "History response carries an ETag",
+        first.status_code == 200 and etag is not None,
+        f"Got status {first.status_code}, ETag {etag}"
+    )
+
+    results.record(
+        "Matching If-None-Match returns 304",
+        unchanged.status_code == 304 and unchanged.data == b'',
+        f"Got status {unchanged.status_code}"
+    )
+
+    results.record(
+        "New row invalidates the ETag",
+        changed.status_code == 200 and len(changed.get_json()) == 2,
+        f"Got status {changed.status_code}"
+    )
+
     return results
 
 
@@ -282,9 +506,12 @@ def run_all_tests():
     all_results = []
 
     all_results.append(test_database())
+    all_results.append(test_lux_timestamp_migration())
     all_results.append(test_api_endpoints())
     all_results.append(test_state_updates())
     all_results.append(test_pwm_validation())
+    all_results.append(test_history_paging())
+    all_results.append(test_history_etag())
 
     # Summary
     total_passed = sum(r.passed for r in all_results)
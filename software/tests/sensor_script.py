@@ -1,6 +1,8 @@
 import requests
+from requests.adapters import HTTPAdapter
+import hashlib
 import time
-import json
+import orjson
 from datetime import datetime
 
 BASE_URL = "https://nitrogen-fixation-light-intensity.vercel.app/"
@@ -8,10 +10,21 @@ BASE_URL = "https://nitrogen-fixation-light-intensity.vercel.app/"
 SENSOR_READ_INTERVAL = 5  # Send sensor data every 5 seconds for real-time updates
 LED_CHECK_INTERVAL = 2    # Check for LED control changes every 2 seconds
 
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
 class RaspberryPiController:
     def __init__(self, base_url):
         self.base_url = base_url
         self.last_led_settings = None
+        # Validators for the last LED status body, so an unchanged poll is
+        # answered with a 304 (or detected by digest) and never re-parsed
+        self._last_etag = None
+        self._last_hash = None
+        # One keep-alive session so each request doesn't redo DNS + TCP + TLS
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2, max_retries=3)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
     def read_sensor_data(self):
     
@@ -32,25 +45,40 @@ class RaspberryPiController:
         url = f"{self.base_url}/api/sensor"
         
         try:
-            response = requests.post(url, json=data, timeout=10)
+            response = self.session.post(url, data=orjson.dumps(data),
+                                         headers=JSON_HEADERS, timeout=10)
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
             print(f"✓ [{datetime.now().strftime('%H:%M:%S')}] Sensor data sent: {data['actual_intensity']:.2f} lux")
             return result
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             print(f"✗ [{datetime.now().strftime('%H:%M:%S')}] Error sending sensor data: {e}")
             return None
     
     def get_led_settings(self):
-        """Fetch current LED control settings from the web app"""
+        """Fetch current LED control settings from the web app
+
+        Returns None when the settings are unchanged since the last poll.
+        """
         url = f"{self.base_url}/api/led/status"
+        headers = {'If-None-Match': self._last_etag} if self._last_etag else None
         
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, headers=headers, timeout=10)
+            if response.status_code == 304:
+                return None  # Not modified, skip parsing entirely
             response.raise_for_status()
-            result = response.json()
+            # Fallback for servers without ETag support
+            h = hashlib.blake2b(response.content, digest_size=8).digest()
+            if h == self._last_hash:
+                return None
+            result = orjson.loads(response.content)
+            # Only remember validators for a body that parsed, so a bad
+            # payload is fetched again instead of being answered with 304
+            self._last_etag = response.headers.get('ETag')
+            self._last_hash = h
             return result.get('status')
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             print(f"✗ [{datetime.now().strftime('%H:%M:%S')}] Error fetching LED settings: {e}")
             return None
     
@@ -121,6 +149,7 @@ class RaspberryPiController:
                 
         except KeyboardInterrupt:
             print("\n\nShutting down gracefully...")
+            self.session.close()
             print("Raspberry Pi IoT Controller stopped.")
 
 if __name__ == "__main__":